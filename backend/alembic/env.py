@@ -1,12 +1,17 @@
 from __future__ import annotations
 
 from logging.config import fileConfig
+import os
 
 from alembic import context
+from alembic.operations import Operations
+from alembic.script import ScriptDirectory
+import sqlalchemy as sa
 from sqlalchemy import engine_from_config, pool
 
 from app.core.config import settings
 from app.db.base import Base
+from app.db.reflection import get_cached_inspector
 from app import models  # noqa: F401
 
 config = context.config
@@ -30,6 +35,52 @@ def run_migrations_offline() -> None:
         context.run_migrations()
 
 
+def _configure_session(connection) -> None:
+    """Session settings for the migration connection.
+
+    Set per session rather than with SET LOCAL so they survive the commits that
+    autocommit_block() issues around concurrent index builds. Skipping the WAL
+    flush wait is safe here: a lost final commit just leaves that revision
+    unapplied in alembic_version. ALEMBIC_LOCK_TIMEOUT (e.g. "5s") makes DDL
+    fail fast instead of queueing behind long-running application transactions.
+    """
+    connection.execute(sa.text("SET synchronous_commit = off"))
+    lock_timeout = os.environ.get("ALEMBIC_LOCK_TIMEOUT")
+    if lock_timeout:
+        connection.execute(
+            sa.text("SELECT set_config('lock_timeout', :value, false)"),
+            {"value": lock_timeout},
+        )
+
+
+def _is_fresh_install(connection) -> bool:
+    """True when upgrading an empty database straight to head."""
+    migrations_fn = context.get_context().opts.get("fn")
+    if getattr(migrations_fn, "__name__", None) != "upgrade":
+        return False
+    if context.get_revision_argument() not in ("head", "heads"):
+        return False
+    return not sa.inspect(connection).get_table_names()
+
+
+def _install_fresh_schema(connection) -> None:
+    """Create the head schema in one pass and stamp it instead of replaying history.
+
+    Only the data seeds that the revision chain leaves behind are replayed: the
+    station rows from 0005 and their camera feed IPs from 0028.
+    """
+    script = ScriptDirectory.from_config(config)
+    initial = script.get_revision("0001_initial").module
+    station_seed = script.get_revision("0005_station_model_seed").module
+    camera_feeds = script.get_revision("0028_station_camera_feeds").module
+    migration_context = context.get_context()
+    with Operations.context(migration_context):
+        connection.execute(sa.text(";\n".join(initial._schema_ddl(connection))))
+        station_seed._seed_stations()
+        camera_feeds._seed_camera_feed_ips(connection)
+    migration_context.stamp(script, "heads")
+
+
 def run_migrations_online() -> None:
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
@@ -41,7 +92,14 @@ def run_migrations_online() -> None:
         context.configure(connection=connection, target_metadata=target_metadata)
 
         with context.begin_transaction():
-            context.run_migrations()
+            _configure_session(connection)
+            if _is_fresh_install(connection):
+                _install_fresh_schema(connection)
+            else:
+                # Revisions share this connection's snapshot, so reflect it once here.
+                _, snapshot = get_cached_inspector(connection)
+                snapshot.prewarm()
+                context.run_migrations()
 
 
 if context.is_offline_mode():
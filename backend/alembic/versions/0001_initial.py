@@ -6,6 +6,13 @@ Create Date: 2025-12-29
 """
 
 from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.schema import (
+    AddConstraint,
+    CreateIndex,
+    CreateTable,
+    sort_tables_and_constraints,
+)
 
 from app.db.base import Base
 from app import models  # noqa: F401
@@ -16,8 +23,43 @@ branch_labels = None
 depends_on = None
 
 
+def _quote_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _schema_ddl(bind) -> list[str]:
+    """Compile the full metadata into DDL in dependency order, like create_all."""
+    dialect = bind.dialect
+    ddl: list[str] = []
+
+    if dialect.name == "postgresql":
+        enum_types: dict[str, sa.Enum] = {}
+        for table in Base.metadata.sorted_tables:
+            for column in table.columns:
+                if isinstance(column.type, sa.Enum) and column.type.native_enum:
+                    enum_types.setdefault(column.type.name, column.type)
+        for name, enum_type in enum_types.items():
+            values = ", ".join(_quote_literal(value) for value in enum_type.enums)
+            quoted_name = dialect.identifier_preparer.quote(name)
+            ddl.append(f"CREATE TYPE {quoted_name} AS ENUM ({values})")
+
+    deferred_fks = []
+    for table, fkcs in sort_tables_and_constraints(Base.metadata.sorted_tables):
+        if table is None:
+            deferred_fks.extend(fkcs)
+            continue
+        create_table = CreateTable(table, include_foreign_key_constraints=fkcs)
+        ddl.append(str(create_table.compile(dialect=dialect)))
+        ddl.extend(str(CreateIndex(index).compile(dialect=dialect)) for index in table.indexes)
+    ddl.extend(str(AddConstraint(fkc).compile(dialect=dialect)) for fkc in deferred_fks)
+    return ddl
+
+
 def upgrade() -> None:
-    Base.metadata.create_all(bind=op.get_bind())
+    bind = op.get_bind()
+    # One batched script instead of create_all's per-object round-trips and
+    # existence probes; this revision always runs against an empty database.
+    op.execute(";\n".join(_schema_ddl(bind)))
 
 
 def downgrade() -> None:
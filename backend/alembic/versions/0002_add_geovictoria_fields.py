@@ -9,18 +9,11 @@ from alembic import op
 import sqlalchemy as sa
 
 
-def _column_exists(conn, table: str, column: str) -> bool:
-    inspector = sa.inspect(conn)
-    return any(col["name"] == column for col in inspector.get_columns(table))
-
-
-def _unique_constraint_exists(conn, table: str, columns: list[str]) -> bool:
-    inspector = sa.inspect(conn)
-    target = sorted(columns)
-    for constraint in inspector.get_unique_constraints(table):
-        if sorted(constraint.get("column_names") or []) == target:
-            return True
-    return False
+def _unique_column_sets(inspector, table: str) -> set[tuple[str, ...]]:
+    return {
+        tuple(sorted(constraint.get("column_names") or []))
+        for constraint in inspector.get_unique_constraints(table)
+    }
 
 revision = "0002_add_geovictoria_fields"
 down_revision = "0001_initial"
@@ -30,20 +23,23 @@ depends_on = None
 
 def upgrade() -> None:
     conn = op.get_bind()
-    if not _column_exists(conn, "workers", "geovictoria_id"):
+    inspector = sa.inspect(conn)
+    columns = {col["name"] for col in inspector.get_columns("workers")}
+    unique_columns = _unique_column_sets(inspector, "workers")
+    if "geovictoria_id" not in columns:
         op.add_column(
             "workers", sa.Column("geovictoria_id", sa.String(length=64), nullable=True)
         )
-    if not _column_exists(conn, "workers", "geovictoria_identifier"):
+    if "geovictoria_identifier" not in columns:
         op.add_column(
             "workers",
             sa.Column("geovictoria_identifier", sa.String(length=32), nullable=True),
         )
-    if not _unique_constraint_exists(conn, "workers", ["geovictoria_id"]):
+    if ("geovictoria_id",) not in unique_columns:
         op.create_unique_constraint(
             "uq_workers_geovictoria_id", "workers", ["geovictoria_id"]
         )
-    if not _unique_constraint_exists(conn, "workers", ["geovictoria_identifier"]):
+    if ("geovictoria_identifier",) not in unique_columns:
         op.create_unique_constraint(
             "uq_workers_geovictoria_identifier",
             "workers",
@@ -63,7 +59,8 @@ def downgrade() -> None:
             op.drop_constraint(name, "workers", type_="unique")
         if columns == ["geovictoria_id"]:
             op.drop_constraint(name, "workers", type_="unique")
-    if _column_exists(conn, "workers", "geovictoria_identifier"):
+    columns = {col["name"] for col in inspector.get_columns("workers")}
+    if "geovictoria_identifier" in columns:
         op.drop_column("workers", "geovictoria_identifier")
-    if _column_exists(conn, "workers", "geovictoria_id"):
+    if "geovictoria_id" in columns:
         op.drop_column("workers", "geovictoria_id")
@@ -15,243 +15,276 @@ branch_labels = None
 depends_on = None
 
 
-_STATION_ID_MAP = {
-    "W1": 1,
-    "W2": 2,
-    "W3": 3,
-    "W4": 4,
-    "W5": 5,
-    "W6": 6,
-    "W7": 7,
-    "W8": 8,
-    "W9": 9,
-    "M1": 10,
-    "A0": 11,
-    "B0": 12,
-    "C0": 13,
-    "A1": 14,
-    "B1": 15,
-    "C1": 16,
-    "A2": 17,
-    "B2": 18,
-    "C2": 19,
-    "A3": 20,
-    "B3": 21,
-    "C3": 22,
-    "A4": 23,
-    "B4": 24,
-    "C4": 25,
-    "A5": 26,
-    "B5": 27,
-    "C5": 28,
-    "A6": 29,
-    "B6": 30,
-    "C6": 31,
-    "AUX1": 32,
-}
-
-
-def _case_mapping(column: str) -> str:
-    cases = []
-    for legacy_id, new_id in _STATION_ID_MAP.items():
-        cases.append(f"WHEN {column} = '{legacy_id}' THEN '{new_id}'")
-    cases.append(f"WHEN {column} ~ '^[0-9]+$' THEN {column}")
-    return "CASE " + " ".join(cases) + " ELSE NULL END"
-
-
-def _remap_station_id(table: str, column: str) -> None:
+def _legacy_station_ids():
+    """Yield (legacy string id, new integer id) pairs for the old station codes."""
+    for number in range(1, 10):
+        yield f"W{number}", number
+    yield "M1", 10
+    for stage in range(7):
+        for offset, line in enumerate("ABC"):
+            yield f"{line}{stage}", 11 + stage * 3 + offset
+    yield "AUX1", 32
+
+
+_STATION_LINE_TYPE = sa.Enum("1", "2", "3", name="stationlinetype")
+_STATION_ROLE = sa.Enum("Panels", "Magazine", "Assembly", "AUX", name="stationrole")
+
+_REMAP_BATCH_SIZE = 10_000
+
+# Statement templates are built once at import so every table is remapped with
+# the same SQL shape; only the table and column names are substituted.
+
+# Postgres rejects subqueries in ALTER COLUMN ... USING, so the lookup lives in a
+# session-local function that the type change calls per row.
+_REMAP_FUNCTION_SQL = """
+    CREATE FUNCTION pg_temp.remap_station_id(value text) RETURNS integer
+    LANGUAGE sql STABLE AS $$
+        SELECT CASE
+            WHEN value ~ '^[0-9]+$' THEN value::integer
+            ELSE (SELECT new_id FROM _station_id_map WHERE legacy = value)
+        END
+    $$
+"""
+
+_ARRAY_SOURCE_SQL = (
+    "CASE "
+    "WHEN jsonb_typeof({table}.{column}) = 'array' THEN {table}.{column} "
+    "WHEN jsonb_typeof({table}.{column}) IN ('string', 'number') "
+    "THEN jsonb_build_array({table}.{column}) "
+    "ELSE '[]'::jsonb END"
+)
+
+_SRC_ARRAY_SOURCE_SQL = _ARRAY_SOURCE_SQL.format(table="src", column="{column}")
+
+# Rows already holding an array of plain integers, including an empty one, are
+# left as they are: the app reads NULL as "all stations" but [] as "none".
+# Every other non-NULL value (legacy codes, numeric strings, junk entries,
+# scalars) is normalized. The CASE keeps the array functions away from scalar
+# values.
+_NEEDS_REMAP_SQL = """
+    {value} IS NOT NULL
+    AND NOT COALESCE(
+        CASE WHEN jsonb_typeof({value}) = 'array' THEN
+            NOT EXISTS (
+                SELECT 1
+                FROM jsonb_array_elements({value}) AS elements(element)
+                WHERE jsonb_typeof(elements.element) <> 'number'
+                   OR elements.element::text !~ '^[0-9]+$'
+            )
+        END,
+        false
+    )
+"""
+
+# Elements are expanded once per row with their position, mapped through the
+# temp table, and re-aggregated in the original order. The left join keeps rows
+# with no usable elements so they become NULL.
+_REMAP_ARRAY_SQL = f"""
+    UPDATE {{table}}
+    SET {{column}} = remapped.station_ids
+    FROM (
+        SELECT
+            src.id,
+            jsonb_agg(el.mapped_id ORDER BY el.ord)
+                FILTER (WHERE el.mapped_id IS NOT NULL) AS station_ids
+        FROM {{table}} src
+        LEFT JOIN LATERAL (
+            SELECT
+                elements.ord,
+                COALESCE(
+                    m.new_id,
+                    CASE WHEN elements.value ~ '^[0-9]+$' THEN elements.value::int END
+                ) AS mapped_id
+            FROM jsonb_array_elements_text({_SRC_ARRAY_SOURCE_SQL})
+                WITH ORDINALITY AS elements(value, ord)
+            LEFT JOIN _station_id_map m ON m.legacy = elements.value
+        ) el ON true
+        WHERE src.id BETWEEN :lo AND :hi
+          AND {_NEEDS_REMAP_SQL.format(value="src.{column}")}
+        GROUP BY src.id
+    ) remapped
+    WHERE {{table}}.id = remapped.id
+"""
+
+_TO_INTEGER_SQL = (
+    "ALTER TABLE {table} ALTER COLUMN {column} TYPE INTEGER "
+    "USING pg_temp.remap_station_id({column})"
+)
+
+
+def _create_station_id_map(conn, station_id_map: dict[str, int]) -> None:
     op.execute(
-        f"UPDATE {table} SET {column} = {_case_mapping(column)}"
+        "CREATE TEMP TABLE _station_id_map (legacy text PRIMARY KEY, new_id integer) "
+        "ON COMMIT DROP"
+    )
+    conn.execute(
+        sa.text("INSERT INTO _station_id_map (legacy, new_id) VALUES (:legacy, :new_id)"),
+        [
+            {"legacy": legacy_id, "new_id": new_id}
+            for legacy_id, new_id in station_id_map.items()
+        ],
     )
 
 
-def _remap_station_id_array(table: str, column: str) -> None:
-    array_source = (
-        f"CASE "
-        f"WHEN jsonb_typeof({table}.{column}) = 'array' THEN {table}.{column} "
-        f"WHEN jsonb_typeof({table}.{column}) IN ('string', 'number') "
-        f"THEN jsonb_build_array({table}.{column}) "
-        f"ELSE '[]'::jsonb END"
+def _execute_in_id_batches(
+    conn, table: str, statement: str, params: dict | None = None
+) -> None:
+    """Run `statement` over `table` in id ranges bound to :lo/:hi.
+
+    The batches run inside the migration transaction and commit together with
+    the stations rebuild, so a failed step never leaves them half applied.
+    """
+    max_id = conn.execute(sa.text(f"SELECT max(id) FROM {table}")).scalar()
+    if max_id is None:
+        return
+    for lo in range(0, max_id + 1, _REMAP_BATCH_SIZE):
+        conn.execute(
+            sa.text(statement),
+            {**(params or {}), "lo": lo, "hi": lo + _REMAP_BATCH_SIZE - 1},
+        )
+
+
+def _remap_station_id_array(conn, table: str, column: str) -> None:
+    _execute_in_id_batches(
+        conn, table, _REMAP_ARRAY_SQL.format(table=table, column=column)
     )
-    cases = []
-    for legacy_id, new_id in _STATION_ID_MAP.items():
-        cases.append(f"WHEN value = '{legacy_id}' THEN {new_id}")
-    cases.append("WHEN value ~ '^[0-9]+$' THEN value::int")
-    case_sql = "CASE " + " ".join(cases) + " ELSE NULL END"
+
+
+def _seed_stations() -> None:
+    """Insert the fixed station rows; also used by the fresh-install path in env.py."""
+    op.execute(
+        """
+        INSERT INTO stations (id, name, role, line_type, sequence_order)
+        VALUES
+            (1, 'Framing', 'Panels', NULL, 1),
+            (2, 'Mesa 1', 'Panels', NULL, 2),
+            (3, 'Puente 1', 'Panels', NULL, 3),
+            (4, 'Mesa 2', 'Panels', NULL, 4),
+            (5, 'Puente 2', 'Panels', NULL, 5),
+            (6, 'Mesa 3', 'Panels', NULL, 6),
+            (7, 'Puente 3', 'Panels', NULL, 7),
+            (8, 'Mesa 4', 'Panels', NULL, 8),
+            (9, 'Puente 4', 'Panels', NULL, 9),
+            (10, 'Magazine', 'Magazine', NULL, 10),
+            (32, 'Precorte Holzma', 'AUX', NULL, NULL)
+        """
+    )
+    # Assembly stations 11-31: "Armado" then "Estacion 1".."Estacion 6", each on
+    # lines 1-3, with ids and sequence orders following the stage/line grid.
     op.execute(
-        f"""
-        UPDATE {table}
-        SET {column} = (
-            SELECT jsonb_agg(mapped_id)
-            FROM (
-                SELECT {case_sql} AS mapped_id
-                FROM jsonb_array_elements_text({array_source}) AS value
-            ) mapped
-            WHERE mapped_id IS NOT NULL
-        )
-        WHERE {column} IS NOT NULL
+        """
+        INSERT INTO stations (id, name, role, line_type, sequence_order)
+        SELECT
+            10 + (stage - 1) * 3 + line,
+            CASE WHEN stage = 1 THEN 'Armado' ELSE 'Estacion ' || (stage - 1) END,
+            'Assembly'::stationrole,
+            line::text::stationlinetype,
+            10 + stage
+        FROM generate_series(1, 7) AS stage, generate_series(1, 3) AS line
         """
     )
+    # The table was just created from a SERIAL id, so the sequence name is fixed
+    # and the highest seeded id is known.
+    op.execute("ALTER SEQUENCE stations_id_seq RESTART WITH 33")
 
 
 def upgrade() -> None:
     conn = op.get_bind()
     op.execute("DROP TABLE IF EXISTS stations CASCADE")
+    station_id_map = dict(_legacy_station_ids())
+    _create_station_id_map(conn, station_id_map)
 
-    for table, column in (
+    station_columns = (
         ("work_units", "current_station_id"),
         ("panel_units", "current_station_id"),
         ("task_instances", "station_id"),
         ("task_exceptions", "station_id"),
         ("qc_check_instances", "station_id"),
-    ):
-        data_type = conn.execute(
+    )
+    data_types = {
+        (row.table_name, row.column_name): row.data_type.lower()
+        for row in conn.execute(
             sa.text(
                 """
-                SELECT data_type
+                SELECT table_name, column_name, data_type
                 FROM information_schema.columns
-                WHERE table_name = :table_name AND column_name = :column_name
+                WHERE table_name = ANY(:table_names)
+                  AND column_name = ANY(:column_names)
                 """
             ),
-            {"table_name": table, "column_name": column},
-        ).scalar_one_or_none()
-        if data_type and data_type.lower() in {"integer", "bigint"}:
-            continue
-        _remap_station_id(table, column)
-        op.execute(
-            f"ALTER TABLE {table} ALTER COLUMN {column} TYPE INTEGER USING {column}::integer"
+            {
+                "table_names": [table for table, _ in station_columns],
+                "column_names": sorted({column for _, column in station_columns}),
+            },
         )
+    }
+    op.execute(_REMAP_FUNCTION_SQL)
+    for table, column in station_columns:
+        if data_types.get((table, column)) in {"integer", "bigint"}:
+            continue
+        # Remap and retype in a single table rewrite; unmapped codes become NULL.
+        op.execute(_TO_INTEGER_SQL.format(table=table, column=column))
 
-    for table, column in (
+    station_array_columns = (
         ("workers", "assigned_station_ids"),
         ("pause_reasons", "applicable_station_ids"),
         ("comment_templates", "applicable_station_ids"),
-    ):
-        array_source = (
-            f"CASE "
-            f"WHEN jsonb_typeof({table}.{column}) = 'array' THEN {table}.{column} "
-            f"WHEN jsonb_typeof({table}.{column}) IN ('string', 'number') "
-            f"THEN jsonb_build_array({table}.{column}) "
-            f"ELSE '[]'::jsonb END"
+    )
+    # One probe across all three columns for a legacy code decides whether any
+    # rewrite is needed; without one the arrays are left exactly as they are.
+    station_arrays = " UNION ALL ".join(
+        f"SELECT {column} AS station_ids FROM {table}"
+        for table, column in station_array_columns
+    )
+    arrays_source = _ARRAY_SOURCE_SQL.format(table="arrays", column="station_ids")
+    legacy_ids = conn.execute(
+        sa.text(
+            f"""
+            SELECT 1
+            FROM ({station_arrays}) arrays
+            WHERE arrays.station_ids IS NOT NULL
+              AND EXISTS (
+                  SELECT 1
+                  FROM jsonb_array_elements_text({arrays_source}) AS elements(value)
+                  JOIN _station_id_map m ON m.legacy = elements.value
+              )
+            LIMIT 1
+            """
         )
-        legacy_ids = conn.execute(
-            sa.text(
-                f"""
-                SELECT 1
-                FROM {table}
-                WHERE {column} IS NOT NULL
-                AND EXISTS (
-                    SELECT 1
-                    FROM jsonb_array_elements_text({array_source}) AS value
-                    WHERE value = ANY(:legacy_ids)
-                )
-                LIMIT 1
-                """
-            ),
-            {"legacy_ids": list(_STATION_ID_MAP.keys())},
-        ).scalar_one_or_none()
-        if legacy_ids:
-            _remap_station_id_array(table, column)
+    ).scalar_one_or_none()
+    if legacy_ids:
+        for table, column in station_array_columns:
+            _remap_station_id_array(conn, table, column)
+    op.execute("DROP FUNCTION IF EXISTS pg_temp.remap_station_id(text)")
+    op.execute("DROP TABLE IF EXISTS _station_id_map")
 
     op.execute("DROP TYPE IF EXISTS stationlinetype")
     op.execute("DROP TYPE IF EXISTS stationrole")
 
-    station_line_type = sa.Enum("1", "2", "3", name="stationlinetype")
-    station_role = sa.Enum("Panels", "Magazine", "Assembly", "AUX", name="stationrole")
-
     op.create_table(
         "stations",
         sa.Column("id", sa.Integer(), primary_key=True),
         sa.Column("name", sa.String(length=200), nullable=False),
-        sa.Column("line_type", station_line_type, nullable=True),
+        sa.Column("line_type", _STATION_LINE_TYPE, nullable=True),
         sa.Column("sequence_order", sa.Integer(), nullable=True),
-        sa.Column("role", station_role, nullable=False),
+        sa.Column("role", _STATION_ROLE, nullable=False),
     )
 
-    station_table = sa.table(
-        "stations",
-        sa.column("id", sa.Integer()),
-        sa.column("name", sa.String()),
-        sa.column("line_type", station_line_type),
-        sa.column("sequence_order", sa.Integer()),
-        sa.column("role", station_role),
-    )
-    op.bulk_insert(
-        station_table,
-        [
-            {"id": 1, "name": "Framing", "role": "Panels", "line_type": None, "sequence_order": 1},
-            {"id": 2, "name": "Mesa 1", "role": "Panels", "line_type": None, "sequence_order": 2},
-            {"id": 3, "name": "Puente 1", "role": "Panels", "line_type": None, "sequence_order": 3},
-            {"id": 4, "name": "Mesa 2", "role": "Panels", "line_type": None, "sequence_order": 4},
-            {"id": 5, "name": "Puente 2", "role": "Panels", "line_type": None, "sequence_order": 5},
-            {"id": 6, "name": "Mesa 3", "role": "Panels", "line_type": None, "sequence_order": 6},
-            {"id": 7, "name": "Puente 3", "role": "Panels", "line_type": None, "sequence_order": 7},
-            {"id": 8, "name": "Mesa 4", "role": "Panels", "line_type": None, "sequence_order": 8},
-            {"id": 9, "name": "Puente 4", "role": "Panels", "line_type": None, "sequence_order": 9},
-            {"id": 10, "name": "Magazine", "role": "Magazine", "line_type": None, "sequence_order": 10},
-            {"id": 11, "name": "Armado", "role": "Assembly", "line_type": "1", "sequence_order": 11},
-            {"id": 12, "name": "Armado", "role": "Assembly", "line_type": "2", "sequence_order": 11},
-            {"id": 13, "name": "Armado", "role": "Assembly", "line_type": "3", "sequence_order": 11},
-            {"id": 14, "name": "Estacion 1", "role": "Assembly", "line_type": "1", "sequence_order": 12},
-            {"id": 15, "name": "Estacion 1", "role": "Assembly", "line_type": "2", "sequence_order": 12},
-            {"id": 16, "name": "Estacion 1", "role": "Assembly", "line_type": "3", "sequence_order": 12},
-            {"id": 17, "name": "Estacion 2", "role": "Assembly", "line_type": "1", "sequence_order": 13},
-            {"id": 18, "name": "Estacion 2", "role": "Assembly", "line_type": "2", "sequence_order": 13},
-            {"id": 19, "name": "Estacion 2", "role": "Assembly", "line_type": "3", "sequence_order": 13},
-            {"id": 20, "name": "Estacion 3", "role": "Assembly", "line_type": "1", "sequence_order": 14},
-            {"id": 21, "name": "Estacion 3", "role": "Assembly", "line_type": "2", "sequence_order": 14},
-            {"id": 22, "name": "Estacion 3", "role": "Assembly", "line_type": "3", "sequence_order": 14},
-            {"id": 23, "name": "Estacion 4", "role": "Assembly", "line_type": "1", "sequence_order": 15},
-            {"id": 24, "name": "Estacion 4", "role": "Assembly", "line_type": "2", "sequence_order": 15},
-            {"id": 25, "name": "Estacion 4", "role": "Assembly", "line_type": "3", "sequence_order": 15},
-            {"id": 26, "name": "Estacion 5", "role": "Assembly", "line_type": "1", "sequence_order": 16},
-            {"id": 27, "name": "Estacion 5", "role": "Assembly", "line_type": "2", "sequence_order": 16},
-            {"id": 28, "name": "Estacion 5", "role": "Assembly", "line_type": "3", "sequence_order": 16},
-            {"id": 29, "name": "Estacion 6", "role": "Assembly", "line_type": "1", "sequence_order": 17},
-            {"id": 30, "name": "Estacion 6", "role": "Assembly", "line_type": "2", "sequence_order": 17},
-            {"id": 31, "name": "Estacion 6", "role": "Assembly", "line_type": "3", "sequence_order": 17},
-            {"id": 32, "name": "Precorte Holzma", "role": "AUX", "line_type": None, "sequence_order": None},
-        ],
-    )
-    op.execute(
-        "SELECT setval(pg_get_serial_sequence('stations', 'id'), (SELECT MAX(id) FROM stations))"
-    )
+    _seed_stations()
 
-    op.create_foreign_key(
-        "work_units_current_station_id_fkey",
-        "work_units",
-        "stations",
-        ["current_station_id"],
-        ["id"],
-    )
-    op.create_foreign_key(
-        "panel_units_current_station_id_fkey",
-        "panel_units",
-        "stations",
-        ["current_station_id"],
-        ["id"],
-    )
-    op.create_foreign_key(
-        "task_instances_station_id_fkey",
-        "task_instances",
-        "stations",
-        ["station_id"],
-        ["id"],
-    )
-    op.create_foreign_key(
-        "task_exceptions_station_id_fkey",
-        "task_exceptions",
-        "stations",
-        ["station_id"],
-        ["id"],
-    )
-    op.create_foreign_key(
-        "qc_check_instances_station_id_fkey",
-        "qc_check_instances",
-        "stations",
-        ["station_id"],
-        ["id"],
-    )
+    station_fks = [
+        (f"{table}_{column}_fkey", table, column) for table, column in station_columns
+    ]
+    # Attach the FKs without validating existing rows, then validate after the
+    # commit: VALIDATE CONSTRAINT only takes a SHARE UPDATE EXCLUSIVE lock.
+    for name, table, column in station_fks:
+        op.execute(
+            f"ALTER TABLE {table} ADD CONSTRAINT {name} "
+            f"FOREIGN KEY ({column}) REFERENCES stations (id) NOT VALID"
+        )
+    with op.get_context().autocommit_block():
+        for name, table, _ in station_fks:
+            op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
 
 
 def downgrade() -> None:
@@ -24,29 +24,35 @@ def upgrade() -> None:
             "task_definitions",
             sa.Column("default_station_sequence", sa.Integer(), nullable=True),
         )
+    # Transient partial index covering only the default (all-NULL scope) rows,
+    # already ordered for the per-definition ranking below.
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS ix_task_applicability_default_rows
+        ON task_applicability (task_definition_id, id)
+        WHERE house_type_id IS NULL
+          AND sub_type_id IS NULL
+          AND module_number IS NULL
+          AND panel_definition_id IS NULL
+        """
+    )
     bind.execute(
         sa.text(
             """
             WITH ranked AS (
-                SELECT
-                    id,
-                    task_definition_id,
-                    station_sequence_order,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY task_definition_id
-                        ORDER BY id
-                    ) AS rn
+                SELECT task_definition_id, MIN(id) AS id
                 FROM task_applicability
                 WHERE house_type_id IS NULL
                   AND sub_type_id IS NULL
                   AND module_number IS NULL
                   AND panel_definition_id IS NULL
+                GROUP BY task_definition_id
             )
             UPDATE task_definitions
-            SET default_station_sequence = ranked.station_sequence_order
+            SET default_station_sequence = ta.station_sequence_order
             FROM ranked
+            JOIN task_applicability ta ON ta.id = ranked.id
             WHERE task_definitions.id = ranked.task_definition_id
-              AND ranked.rn = 1
             """
         )
     )
@@ -62,10 +68,13 @@ def upgrade() -> None:
             """
         )
     )
+    op.execute("DROP INDEX IF EXISTS ix_task_applicability_default_rows")
 
 
 def downgrade() -> None:
     bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    columns = {col["name"] for col in inspector.get_columns("task_definitions")}
     bind.execute(
         sa.text(
             """
@@ -113,7 +122,5 @@ def downgrade() -> None:
             """
         )
     )
-    inspector = sa.inspect(bind)
-    columns = {col["name"] for col in inspector.get_columns("task_definitions")}
     if "default_station_sequence" in columns:
         op.drop_column("task_definitions", "default_station_sequence")
@@ -49,15 +49,13 @@ def downgrade() -> None:
                 TRUE,
                 td.default_station_sequence
             FROM task_definitions td
-            WHERE NOT EXISTS (
-                SELECT 1
-                FROM task_applicability ta
-                WHERE ta.task_definition_id = td.id
-                  AND ta.house_type_id IS NULL
-                  AND ta.sub_type_id IS NULL
-                  AND ta.module_number IS NULL
-                  AND ta.panel_definition_id IS NULL
-            )
+            LEFT JOIN task_applicability ta
+              ON ta.task_definition_id = td.id
+             AND ta.house_type_id IS NULL
+             AND ta.sub_type_id IS NULL
+             AND ta.module_number IS NULL
+             AND ta.panel_definition_id IS NULL
+            WHERE ta.id IS NULL
             """
         )
     )
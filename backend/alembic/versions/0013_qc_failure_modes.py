@@ -9,250 +9,199 @@ from alembic import op
 import sqlalchemy as sa
 from sqlalchemy.dialects import postgresql
 
+from app.db.ddl_spec import TableSpec, create_indexes, create_tables, unapply
+from app.db.reflection import SchemaSnapshot, get_cached_inspector
+
 
 revision = "0013_qc_failure_modes"
 down_revision = "0012_drop_default_applicability"
 branch_labels = None
 depends_on = None
 
-
-def upgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-
-    if not inspector.has_table("qc_check_categories"):
-        op.create_table(
-            "qc_check_categories",
+_TABLES = [
+    TableSpec(
+        "qc_check_categories",
+        columns=(
             sa.Column("id", sa.Integer(), nullable=False),
             sa.Column("name", sa.String(length=200), nullable=False),
             sa.Column("parent_id", sa.Integer(), nullable=True),
-            sa.Column("active", sa.Boolean(), nullable=False, default=True),
+            sa.Column("active", sa.Boolean(), nullable=False),
             sa.Column("sort_order", sa.Integer(), nullable=True),
-            sa.ForeignKeyConstraint(["parent_id"], ["qc_check_categories.id"]),
-            sa.PrimaryKeyConstraint("id"),
-        )
-    index_names = {idx["name"] for idx in inspector.get_indexes("qc_check_categories")}
-    if "ix_qc_check_categories_parent_id" not in index_names:
-        op.create_index(
-            "ix_qc_check_categories_parent_id",
-            "qc_check_categories",
-            ["parent_id"],
-        )
-
-    if not inspector.has_table("qc_severity_levels"):
-        op.create_table(
-            "qc_severity_levels",
+        ),
+        indexes={"ix_qc_check_categories_parent_id": ("parent_id",)},
+        foreign_keys={"parent_id": "qc_check_categories.id"},
+    ),
+    TableSpec(
+        "qc_severity_levels",
+        columns=(
             sa.Column("id", sa.Integer(), nullable=False),
             sa.Column("name", sa.String(length=100), nullable=False),
             sa.Column("sort_order", sa.Integer(), nullable=True),
-            sa.Column("active", sa.Boolean(), nullable=False, default=True),
-            sa.PrimaryKeyConstraint("id"),
-        )
-
-    if not inspector.has_table("qc_check_severity_options"):
-        op.create_table(
-            "qc_check_severity_options",
+            sa.Column("active", sa.Boolean(), nullable=False),
+        ),
+    ),
+    TableSpec(
+        "qc_check_severity_options",
+        columns=(
             sa.Column("id", sa.Integer(), nullable=False),
             sa.Column("check_definition_id", sa.Integer(), nullable=False),
             sa.Column("severity_level_id", sa.Integer(), nullable=False),
-            sa.Column("is_default", sa.Boolean(), nullable=False, default=False),
-            sa.ForeignKeyConstraint(
-                ["check_definition_id"], ["qc_check_definitions.id"]
+            sa.Column("is_default", sa.Boolean(), nullable=False),
+        ),
+        indexes={
+            "ix_qc_check_severity_options_check_definition_id": (
+                "check_definition_id",
             ),
-            sa.ForeignKeyConstraint(["severity_level_id"], ["qc_severity_levels.id"]),
-            sa.PrimaryKeyConstraint("id"),
-        )
-    index_names = {
-        idx["name"] for idx in inspector.get_indexes("qc_check_severity_options")
-    }
-    if "ix_qc_check_severity_options_check_definition_id" not in index_names:
-        op.create_index(
-            "ix_qc_check_severity_options_check_definition_id",
-            "qc_check_severity_options",
-            ["check_definition_id"],
-        )
-    if "ix_qc_check_severity_options_severity_level_id" not in index_names:
-        op.create_index(
-            "ix_qc_check_severity_options_severity_level_id",
-            "qc_check_severity_options",
-            ["severity_level_id"],
-        )
-
-    if not inspector.has_table("qc_failure_mode_definitions"):
-        op.create_table(
-            "qc_failure_mode_definitions",
+            "ix_qc_check_severity_options_severity_level_id": ("severity_level_id",),
+        },
+        foreign_keys={
+            "check_definition_id": "qc_check_definitions.id",
+            "severity_level_id": "qc_severity_levels.id",
+        },
+    ),
+    TableSpec(
+        "qc_failure_mode_definitions",
+        columns=(
             sa.Column("id", sa.Integer(), nullable=False),
             sa.Column("check_definition_id", sa.Integer(), nullable=True),
             sa.Column("name", sa.String(length=200), nullable=False),
             sa.Column("description", sa.Text(), nullable=True),
             sa.Column("default_severity_level_id", sa.Integer(), nullable=True),
             sa.Column("default_rework_description", sa.Text(), nullable=True),
-            sa.Column("require_evidence", sa.Boolean(), nullable=False, default=False),
-            sa.Column("require_measurement", sa.Boolean(), nullable=False, default=False),
-            sa.Column("active", sa.Boolean(), nullable=False, default=True),
+            sa.Column("require_evidence", sa.Boolean(), nullable=False),
+            sa.Column("require_measurement", sa.Boolean(), nullable=False),
+            sa.Column("active", sa.Boolean(), nullable=False),
             sa.Column("created_by_user_id", sa.Integer(), nullable=True),
             sa.Column("archived_at", sa.DateTime(), nullable=True),
-            sa.ForeignKeyConstraint(
-                ["check_definition_id"], ["qc_check_definitions.id"]
+        ),
+        indexes={
+            "ix_qc_failure_mode_definitions_check_definition_id": (
+                "check_definition_id",
             ),
-            sa.ForeignKeyConstraint(
-                ["default_severity_level_id"], ["qc_severity_levels.id"]
+            "ix_qc_failure_mode_definitions_default_severity_level_id": (
+                "default_severity_level_id",
             ),
-            sa.ForeignKeyConstraint(["created_by_user_id"], ["admin_users.id"]),
-            sa.PrimaryKeyConstraint("id"),
-        )
-    else:
-        failure_mode_cols = {
-            col["name"] for col in inspector.get_columns("qc_failure_mode_definitions")
-        }
-        if "check_definition_id" not in failure_mode_cols:
-            op.add_column(
-                "qc_failure_mode_definitions",
-                sa.Column("check_definition_id", sa.Integer(), nullable=True),
-            )
-        if "default_severity_level_id" not in failure_mode_cols:
-            op.add_column(
-                "qc_failure_mode_definitions",
-                sa.Column("default_severity_level_id", sa.Integer(), nullable=True),
-            )
-        if "created_by_user_id" not in failure_mode_cols:
-            op.add_column(
-                "qc_failure_mode_definitions",
-                sa.Column("created_by_user_id", sa.Integer(), nullable=True),
-            )
-        existing_fks = inspector.get_foreign_keys("qc_failure_mode_definitions")
-        fk_columns = {tuple(fk.get("constrained_columns") or []) for fk in existing_fks}
-        if ("check_definition_id",) not in fk_columns:
-            op.create_foreign_key(
-                "fk_qc_failure_mode_definitions_check_definition_id",
-                "qc_failure_mode_definitions",
-                "qc_check_definitions",
-                ["check_definition_id"],
-                ["id"],
-            )
-        if ("default_severity_level_id",) not in fk_columns:
-            op.create_foreign_key(
-                "fk_qc_failure_mode_definitions_default_severity_level_id",
-                "qc_failure_mode_definitions",
-                "qc_severity_levels",
-                ["default_severity_level_id"],
-                ["id"],
-            )
-        if ("created_by_user_id",) not in fk_columns:
-            op.create_foreign_key(
-                "fk_qc_failure_mode_definitions_created_by_user_id",
-                "qc_failure_mode_definitions",
-                "admin_users",
-                ["created_by_user_id"],
-                ["id"],
-            )
-    index_names = {
-        idx["name"] for idx in inspector.get_indexes("qc_failure_mode_definitions")
-    }
-    failure_mode_cols = {
-        col["name"] for col in inspector.get_columns("qc_failure_mode_definitions")
-    }
-    if (
-        "check_definition_id" in failure_mode_cols
-        and "ix_qc_failure_mode_definitions_check_definition_id" not in index_names
-    ):
-        op.create_index(
-            "ix_qc_failure_mode_definitions_check_definition_id",
-            "qc_failure_mode_definitions",
-            ["check_definition_id"],
-        )
-    if (
-        "default_severity_level_id" in failure_mode_cols
-        and "ix_qc_failure_mode_definitions_default_severity_level_id"
-        not in index_names
-    ):
-        op.create_index(
-            "ix_qc_failure_mode_definitions_default_severity_level_id",
-            "qc_failure_mode_definitions",
-            ["default_severity_level_id"],
-        )
-    if (
-        "created_by_user_id" in failure_mode_cols
-        and "ix_qc_failure_mode_definitions_created_by_user_id" not in index_names
-    ):
-        op.create_index(
-            "ix_qc_failure_mode_definitions_created_by_user_id",
-            "qc_failure_mode_definitions",
-            ["created_by_user_id"],
-        )
-
-    if not inspector.has_table("qc_execution_failure_modes"):
-        op.create_table(
-            "qc_execution_failure_modes",
+            "ix_qc_failure_mode_definitions_created_by_user_id": (
+                "created_by_user_id",
+            ),
+        },
+        foreign_keys={
+            "check_definition_id": "qc_check_definitions.id",
+            "default_severity_level_id": "qc_severity_levels.id",
+            "created_by_user_id": "admin_users.id",
+        },
+    ),
+    TableSpec(
+        "qc_execution_failure_modes",
+        columns=(
             sa.Column("id", sa.Integer(), nullable=False),
             sa.Column("execution_id", sa.Integer(), nullable=False),
             sa.Column("failure_mode_definition_id", sa.Integer(), nullable=True),
             sa.Column("other_text", sa.Text(), nullable=True),
             sa.Column("measurement_json", postgresql.JSONB(), nullable=True),
             sa.Column("notes", sa.Text(), nullable=True),
-            sa.ForeignKeyConstraint(["execution_id"], ["qc_executions.id"]),
-            sa.ForeignKeyConstraint(
-                ["failure_mode_definition_id"], ["qc_failure_mode_definitions.id"]
+        ),
+        indexes={
+            "ix_qc_execution_failure_modes_execution_id": ("execution_id",),
+            "ix_qc_execution_failure_modes_failure_mode_definition_id": (
+                "failure_mode_definition_id",
             ),
-            sa.PrimaryKeyConstraint("id"),
+        },
+        foreign_keys={
+            "execution_id": "qc_executions.id",
+            "failure_mode_definition_id": "qc_failure_mode_definitions.id",
+        },
+    ),
+]
+
+
+def _add_failure_mode_links(snap: SchemaSnapshot) -> None:
+    """Add the link columns and foreign keys to a pre-existing failure mode table."""
+    failure_mode_cols = snap.columns("qc_failure_mode_definitions")
+    if "check_definition_id" not in failure_mode_cols:
+        snap.add_column(
+            "qc_failure_mode_definitions",
+            sa.Column("check_definition_id", sa.Integer(), nullable=True),
         )
-    index_names = {
-        idx["name"] for idx in inspector.get_indexes("qc_execution_failure_modes")
-    }
-    if "ix_qc_execution_failure_modes_execution_id" not in index_names:
-        op.create_index(
-            "ix_qc_execution_failure_modes_execution_id",
-            "qc_execution_failure_modes",
-            ["execution_id"],
+    if "default_severity_level_id" not in failure_mode_cols:
+        snap.add_column(
+            "qc_failure_mode_definitions",
+            sa.Column("default_severity_level_id", sa.Integer(), nullable=True),
         )
-    if "ix_qc_execution_failure_modes_failure_mode_definition_id" not in index_names:
-        op.create_index(
-            "ix_qc_execution_failure_modes_failure_mode_definition_id",
-            "qc_execution_failure_modes",
-            ["failure_mode_definition_id"],
+    if "created_by_user_id" not in failure_mode_cols:
+        snap.add_column(
+            "qc_failure_mode_definitions",
+            sa.Column("created_by_user_id", sa.Integer(), nullable=True),
         )
-
-    qc_check_definition_cols = {
-        col["name"] for col in inspector.get_columns("qc_check_definitions")
-    }
-    if "category_id" not in qc_check_definition_cols:
-        op.add_column(
+    existing_fks = snap.foreign_keys("qc_failure_mode_definitions")
+    fk_columns = {tuple(fk.get("constrained_columns") or []) for fk in existing_fks}
+    if ("check_definition_id",) not in fk_columns:
+        snap.create_foreign_key(
+            "fk_qc_failure_mode_definitions_check_definition_id",
+            "qc_failure_mode_definitions",
             "qc_check_definitions",
-            sa.Column("category_id", sa.Integer(), nullable=True),
+            ["check_definition_id"],
+            ["id"],
         )
-        op.create_foreign_key(
-            "fk_qc_check_definitions_category_id",
-            "qc_check_definitions",
-            "qc_check_categories",
-            ["category_id"],
+    if ("default_severity_level_id",) not in fk_columns:
+        snap.create_foreign_key(
+            "fk_qc_failure_mode_definitions_default_severity_level_id",
+            "qc_failure_mode_definitions",
+            "qc_severity_levels",
+            ["default_severity_level_id"],
+            ["id"],
+        )
+    if ("created_by_user_id",) not in fk_columns:
+        snap.create_foreign_key(
+            "fk_qc_failure_mode_definitions_created_by_user_id",
+            "qc_failure_mode_definitions",
+            "admin_users",
+            ["created_by_user_id"],
             ["id"],
         )
-    index_names = {idx["name"] for idx in inspector.get_indexes("qc_check_definitions")}
+
+
+def upgrade() -> None:
+    _, snap = get_cached_inspector(op.get_bind())
+    had_failure_modes = snap.has_table("qc_failure_mode_definitions")
+
+    # All new tables in one round-trip; IF NOT EXISTS replaces the per-table probes.
+    create_tables(_TABLES)
+    if had_failure_modes:
+        _add_failure_mode_links(snap)
+    create_indexes(_TABLES)
+    for spec in _TABLES:
+        snap.invalidate(spec.name)
+
+    qc_check_definition_cols = snap.columns("qc_check_definitions")
+    if "category_id" not in qc_check_definition_cols:
+        op.execute(
+            "ALTER TABLE qc_check_definitions "
+            "ADD COLUMN category_id INTEGER, "
+            "ADD CONSTRAINT fk_qc_check_definitions_category_id "
+            "FOREIGN KEY (category_id) REFERENCES qc_check_categories (id)"
+        )
+        snap.invalidate("qc_check_definitions")
+    index_names = snap.indexes("qc_check_definitions")
     if "ix_qc_check_definitions_category_id" not in index_names:
-        op.create_index(
+        snap.create_index_concurrently(
             "ix_qc_check_definitions_category_id",
             "qc_check_definitions",
             ["category_id"],
         )
 
-    qc_check_instance_cols = {
-        col["name"] for col in inspector.get_columns("qc_check_instances")
-    }
+    qc_check_instance_cols = snap.columns("qc_check_instances")
     if "severity_level_id" not in qc_check_instance_cols:
-        op.add_column(
-            "qc_check_instances",
-            sa.Column("severity_level_id", sa.Integer(), nullable=True),
-        )
-        op.create_foreign_key(
-            "fk_qc_check_instances_severity_level_id",
-            "qc_check_instances",
-            "qc_severity_levels",
-            ["severity_level_id"],
-            ["id"],
-        )
-    index_names = {idx["name"] for idx in inspector.get_indexes("qc_check_instances")}
+        op.execute(
+            "ALTER TABLE qc_check_instances "
+            "ADD COLUMN severity_level_id INTEGER, "
+            "ADD CONSTRAINT fk_qc_check_instances_severity_level_id "
+            "FOREIGN KEY (severity_level_id) REFERENCES qc_severity_levels (id)"
+        )
+        snap.invalidate("qc_check_instances")
+    index_names = snap.indexes("qc_check_instances")
     if "ix_qc_check_instances_severity_level_id" not in index_names:
-        op.create_index(
+        snap.create_index_concurrently(
             "ix_qc_check_instances_severity_level_id",
             "qc_check_instances",
             ["severity_level_id"],
@@ -260,66 +209,8 @@ def upgrade() -> None:
 
 
 def downgrade() -> None:
-    op.drop_index(
-        "ix_qc_check_instances_severity_level_id",
-        table_name="qc_check_instances",
-    )
-    op.drop_constraint(
-        "fk_qc_check_instances_severity_level_id",
-        "qc_check_instances",
-        type_="foreignkey",
-    )
+    # Dropping a column or table takes its indexes and foreign keys with it, so
+    # no separate drop_index/drop_constraint round-trips are needed.
     op.drop_column("qc_check_instances", "severity_level_id")
-
-    op.drop_index(
-        "ix_qc_check_definitions_category_id",
-        table_name="qc_check_definitions",
-    )
-    op.drop_constraint(
-        "fk_qc_check_definitions_category_id",
-        "qc_check_definitions",
-        type_="foreignkey",
-    )
     op.drop_column("qc_check_definitions", "category_id")
-
-    op.drop_index(
-        "ix_qc_execution_failure_modes_failure_mode_definition_id",
-        table_name="qc_execution_failure_modes",
-    )
-    op.drop_index(
-        "ix_qc_execution_failure_modes_execution_id",
-        table_name="qc_execution_failure_modes",
-    )
-    op.drop_table("qc_execution_failure_modes")
-
-    op.drop_index(
-        "ix_qc_failure_mode_definitions_created_by_user_id",
-        table_name="qc_failure_mode_definitions",
-    )
-    op.drop_index(
-        "ix_qc_failure_mode_definitions_default_severity_level_id",
-        table_name="qc_failure_mode_definitions",
-    )
-    op.drop_index(
-        "ix_qc_failure_mode_definitions_check_definition_id",
-        table_name="qc_failure_mode_definitions",
-    )
-    op.drop_table("qc_failure_mode_definitions")
-
-    op.drop_index(
-        "ix_qc_check_severity_options_severity_level_id",
-        table_name="qc_check_severity_options",
-    )
-    op.drop_index(
-        "ix_qc_check_severity_options_check_definition_id",
-        table_name="qc_check_severity_options",
-    )
-    op.drop_table("qc_check_severity_options")
-
-    op.drop_table("qc_severity_levels")
-
-    op.drop_index(
-        "ix_qc_check_categories_parent_id",
-        table_name="qc_check_categories",
-    )
-    op.drop_table("qc_check_categories")
+    unapply(reversed(_TABLES))
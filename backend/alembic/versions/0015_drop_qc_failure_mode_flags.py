@@ -6,7 +6,9 @@ Create Date: 2026-01-09
 """
 
 from alembic import op
-import sqlalchemy as sa
+
+from app.db.ddl_spec import batched_alter
+from app.db.reflection import SKIP_SCHEMA_GUARDS, get_cached_inspector
 
 
 revision = "0015_drop_qc_failure_mode_flags"
@@ -16,40 +18,40 @@ depends_on = None
 
 
 def upgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    table_names = set(inspector.get_table_names())
-
-    if "qc_failure_mode_definitions" not in table_names:
+    flags = ("require_evidence", "require_measurement")
+    if not SKIP_SCHEMA_GUARDS:
+        _, snap = get_cached_inspector(op.get_bind())
+        columns = snap.columns("qc_failure_mode_definitions")
+        flags = tuple(flag for flag in flags if flag in columns)
+        snap.invalidate("qc_failure_mode_definitions")
+    if not flags:
         return
 
-    columns = {
-        column["name"] for column in inspector.get_columns("qc_failure_mode_definitions")
-    }
-    if "require_evidence" in columns:
-        op.drop_column("qc_failure_mode_definitions", "require_evidence")
-    if "require_measurement" in columns:
-        op.drop_column("qc_failure_mode_definitions", "require_measurement")
+    # One ALTER TABLE so the exclusive lock is taken once for both drops.
+    drops = ", ".join(f"DROP COLUMN IF EXISTS {flag}" for flag in flags)
+    op.execute(f"ALTER TABLE IF EXISTS qc_failure_mode_definitions {drops}")
 
 
 def downgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    table_names = set(inspector.get_table_names())
+    _, snap = get_cached_inspector(op.get_bind())
+    table_names = snap.table_names
 
     if "qc_failure_mode_definitions" not in table_names:
         return
 
-    columns = {
-        column["name"] for column in inspector.get_columns("qc_failure_mode_definitions")
-    }
-    if "require_evidence" not in columns:
-        op.add_column(
-            "qc_failure_mode_definitions",
-            sa.Column("require_evidence", sa.Boolean(), nullable=False, default=False),
-        )
-    if "require_measurement" not in columns:
-        op.add_column(
-            "qc_failure_mode_definitions",
-            sa.Column("require_measurement", sa.Boolean(), nullable=False, default=False),
-        )
+    columns = snap.columns("qc_failure_mode_definitions")
+    # Existing rows are backfilled through the default, which is dropped again
+    # in the same statement.
+    batched_alter(
+        "qc_failure_mode_definitions",
+        *(
+            clause
+            for flag in ("require_evidence", "require_measurement")
+            if flag not in columns
+            for clause in (
+                f"ADD COLUMN {flag} BOOLEAN NOT NULL DEFAULT false",
+                f"ALTER COLUMN {flag} DROP DEFAULT",
+            )
+        ),
+    )
+    snap.invalidate("qc_failure_mode_definitions")
@@ -9,6 +9,8 @@ from alembic import op
 import sqlalchemy as sa
 from sqlalchemy.dialects import postgresql
 
+from app.db.reflection import get_cached_inspector
+
 
 revision = "0016_qc_check_media"
 down_revision = "0015_drop_qc_failure_mode_flags"
@@ -18,14 +20,17 @@ depends_on = None
 
 def upgrade() -> None:
     bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    table_names = set(inspector.get_table_names())
+    _, snap = get_cached_inspector(bind)
+    table_names = snap.table_names
 
     if "qc_check_media_assets" in table_names:
         return
 
-    existing_enums = {enum["name"] for enum in inspector.get_enums()}
-    if "qccheckmediatype" not in existing_enums:
+    type_exists = bind.scalar(
+        sa.text("SELECT 1 FROM pg_type WHERE typname = :name"),
+        {"name": "qccheckmediatype"},
+    )
+    if not type_exists:
         media_type_enum = postgresql.ENUM(
             "guidance", "reference", name="qccheckmediatype"
         )
@@ -34,7 +39,7 @@ def upgrade() -> None:
         "guidance", "reference", name="qccheckmediatype", create_type=False
     )
 
-    op.create_table(
+    snap.create_table(
         "qc_check_media_assets",
         sa.Column("id", sa.Integer(), nullable=False),
         sa.Column("check_definition_id", sa.Integer(), nullable=False),
@@ -51,7 +56,7 @@ def upgrade() -> None:
         ),
         sa.PrimaryKeyConstraint("id"),
     )
-    op.create_index(
+    snap.create_index(
         "ix_qc_check_media_assets_check_definition_id",
         "qc_check_media_assets",
         ["check_definition_id"],
@@ -59,18 +64,14 @@ def upgrade() -> None:
 
 
 def downgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    table_names = set(inspector.get_table_names())
+    _, snap = get_cached_inspector(op.get_bind())
+    table_names = snap.table_names
 
     if "qc_check_media_assets" in table_names:
-        op.drop_index(
+        snap.drop_index(
             "ix_qc_check_media_assets_check_definition_id",
             table_name="qc_check_media_assets",
         )
-        op.drop_table("qc_check_media_assets")
+        snap.drop_table("qc_check_media_assets")
 
-    media_type_enum = postgresql.ENUM(
-        "guidance", "reference", name="qccheckmediatype", create_type=False
-    )
-    media_type_enum.drop(bind, checkfirst=True)
+    op.execute("DROP TYPE IF EXISTS qccheckmediatype")
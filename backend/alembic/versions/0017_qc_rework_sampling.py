@@ -8,6 +8,9 @@ Create Date: 2026-01-09
 from alembic import op
 import sqlalchemy as sa
 
+from app.db.ddl_spec import batched_alter
+from app.db.reflection import SKIP_SCHEMA_GUARDS, get_cached_inspector
+
 
 revision = "0017_qc_rework_sampling"
 down_revision = "0016_qc_check_media"
@@ -15,92 +18,111 @@ branch_labels = None
 depends_on = None
 
 
-def _drop_fk_if_exists(inspector: sa.Inspector, table: str, column: str) -> None:
-    for fk in inspector.get_foreign_keys(table):
-        if column in fk.get("constrained_columns", []):
-            if fk.get("name"):
-                op.drop_constraint(fk["name"], table, type_="foreignkey")
-
-
-def _drop_index_if_exists(inspector: sa.Inspector, table: str, index_name: str) -> None:
-    index_names = {idx["name"] for idx in inspector.get_indexes(table)}
-    if index_name in index_names:
-        op.drop_index(index_name, table_name=table)
+def _upgrade_without_guards() -> None:
+    op.execute(
+        "ALTER TABLE IF EXISTS task_definitions "
+        "ADD COLUMN IF NOT EXISTS is_rework BOOLEAN NOT NULL DEFAULT false, "
+        "ALTER COLUMN is_rework DROP DEFAULT"
+    )
+    op.execute(
+        "ALTER TABLE IF EXISTS task_instances "
+        "ADD COLUMN IF NOT EXISTS rework_task_id INTEGER "
+        "CONSTRAINT fk_task_instances_rework_task_id REFERENCES qc_rework_tasks (id)"
+    )
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_task_instances_rework_task_id "
+            "ON task_instances (rework_task_id)"
+        )
+    op.execute(
+        "ALTER TABLE IF EXISTS qc_triggers "
+        "ADD COLUMN IF NOT EXISTS current_sampling_rate DOUBLE PRECISION"
+    )
+    op.execute(
+        "ALTER TABLE IF EXISTS qc_check_instances "
+        "DROP COLUMN IF EXISTS sampling_selected, "
+        "DROP COLUMN IF EXISTS sampling_probability"
+    )
 
 
 def upgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    table_names = set(inspector.get_table_names())
+    if SKIP_SCHEMA_GUARDS:
+        _upgrade_without_guards()
+        return
+
+    _, snap = get_cached_inspector(op.get_bind())
+    table_names = snap.table_names
 
     if "task_definitions" in table_names:
-        columns = {column["name"] for column in inspector.get_columns("task_definitions")}
+        columns = snap.columns("task_definitions")
         if "is_rework" not in columns:
-            op.add_column(
+            # Existing rows are backfilled through the default, which is dropped
+            # again in the same statement; the model supplies it on insert.
+            batched_alter(
                 "task_definitions",
-                sa.Column(
-                    "is_rework",
-                    sa.Boolean(),
-                    nullable=False,
-                    server_default=sa.false(),
-                ),
+                "ADD COLUMN is_rework BOOLEAN NOT NULL DEFAULT false",
+                "ALTER COLUMN is_rework DROP DEFAULT",
             )
+            snap.invalidate("task_definitions")
 
     if "task_instances" in table_names:
-        columns = {column["name"] for column in inspector.get_columns("task_instances")}
+        columns = snap.columns("task_instances")
         if "rework_task_id" not in columns:
-            op.add_column(
+            snap.add_column(
                 "task_instances",
                 sa.Column("rework_task_id", sa.Integer(), nullable=True),
             )
-            op.create_foreign_key(
-                "fk_task_instances_rework_task_id",
-                "task_instances",
-                "qc_rework_tasks",
-                ["rework_task_id"],
-                ["id"],
+            # NOT VALID skips the full-table check under the ALTER's lock; the
+            # validation runs after commit and only takes SHARE UPDATE EXCLUSIVE.
+            op.execute(
+                "ALTER TABLE task_instances "
+                "ADD CONSTRAINT fk_task_instances_rework_task_id "
+                "FOREIGN KEY (rework_task_id) REFERENCES qc_rework_tasks (id) NOT VALID"
             )
-            op.create_index(
-                "ix_task_instances_rework_task_id",
-                "task_instances",
-                ["rework_task_id"],
+            with op.get_context().autocommit_block():
+                op.execute(
+                    "ALTER TABLE task_instances "
+                    "VALIDATE CONSTRAINT fk_task_instances_rework_task_id"
+                )
+            snap.invalidate("task_instances")
+            snap.create_index_concurrently(
+                "ix_task_instances_rework_task_id", "task_instances", ["rework_task_id"]
             )
 
     if "qc_triggers" in table_names:
-        columns = {column["name"] for column in inspector.get_columns("qc_triggers")}
+        columns = snap.columns("qc_triggers")
         if "current_sampling_rate" not in columns:
-            op.add_column(
+            snap.add_column(
                 "qc_triggers",
                 sa.Column("current_sampling_rate", sa.Float(), nullable=True),
             )
 
     if "qc_check_instances" in table_names:
-        columns = {column["name"] for column in inspector.get_columns("qc_check_instances")}
+        columns = snap.columns("qc_check_instances")
         if "sampling_selected" in columns:
-            op.drop_column("qc_check_instances", "sampling_selected")
+            snap.drop_column("qc_check_instances", "sampling_selected")
         if "sampling_probability" in columns:
-            op.drop_column("qc_check_instances", "sampling_probability")
+            snap.drop_column("qc_check_instances", "sampling_probability")
 
 
 def downgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    table_names = set(inspector.get_table_names())
+    _, snap = get_cached_inspector(op.get_bind())
+    table_names = snap.table_names
 
     if "qc_check_instances" in table_names:
-        columns = {column["name"] for column in inspector.get_columns("qc_check_instances")}
+        columns = snap.columns("qc_check_instances")
         if "sampling_selected" not in columns:
-            op.add_column(
+            snap.add_column(
                 "qc_check_instances",
                 sa.Column(
                     "sampling_selected",
                     sa.Boolean(),
                     nullable=False,
-                    server_default=sa.true(),
+                    server_default=sa.text("true"),
                 ),
             )
         if "sampling_probability" not in columns:
-            op.add_column(
+            snap.add_column(
                 "qc_check_instances",
                 sa.Column(
                     "sampling_probability",
@@ -111,18 +133,17 @@ def downgrade() -> None:
             )
 
     if "qc_triggers" in table_names:
-        columns = {column["name"] for column in inspector.get_columns("qc_triggers")}
+        columns = snap.columns("qc_triggers")
         if "current_sampling_rate" in columns:
-            op.drop_column("qc_triggers", "current_sampling_rate")
+            snap.drop_column("qc_triggers", "current_sampling_rate")
 
     if "task_instances" in table_names:
-        columns = {column["name"] for column in inspector.get_columns("task_instances")}
+        columns = snap.columns("task_instances")
         if "rework_task_id" in columns:
-            _drop_fk_if_exists(inspector, "task_instances", "rework_task_id")
-            _drop_index_if_exists(inspector, "task_instances", "ix_task_instances_rework_task_id")
-            op.drop_column("task_instances", "rework_task_id")
+            # Dropping the column takes its index and foreign key with it.
+            snap.drop_column("task_instances", "rework_task_id")
 
     if "task_definitions" in table_names:
-        columns = {column["name"] for column in inspector.get_columns("task_definitions")}
+        columns = snap.columns("task_definitions")
         if "is_rework" in columns:
-            op.drop_column("task_definitions", "is_rework")
+            snap.drop_column("task_definitions", "is_rework")
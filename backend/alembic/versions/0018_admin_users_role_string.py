@@ -6,7 +6,8 @@ Create Date: 2026-01-05
 """
 
 from alembic import op
-import sqlalchemy as sa
+
+from app.db.reflection import SKIP_SCHEMA_GUARDS, get_cached_inspector
 
 
 revision = "0018_admin_users_role_string"
@@ -16,53 +17,36 @@ depends_on = None
 
 
 def upgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    if not inspector.has_table("admin_users"):
-        return
-
-    existing_columns = {col["name"] for col in inspector.get_columns("admin_users")}
-    if "active" not in existing_columns:
-        op.add_column(
-            "admin_users",
-            sa.Column("active", sa.Boolean(), nullable=False, server_default=sa.text("true")),
-        )
-        op.alter_column("admin_users", "active", server_default=None)
+    if not SKIP_SCHEMA_GUARDS:
+        _, snap = get_cached_inspector(op.get_bind())
+        if not snap.has_table("admin_users"):
+            return
+        snap.invalidate("admin_users")
 
+    # Existing rows get the default while the column is added; dropping it in
+    # the same ALTER TABLE leaves no default behind, with one catalog update.
     op.execute(
-        "ALTER TABLE admin_users ALTER COLUMN role TYPE VARCHAR(50) USING role::text"
+        "ALTER TABLE admin_users "
+        "ADD COLUMN IF NOT EXISTS active BOOLEAN NOT NULL DEFAULT true, "
+        "ALTER COLUMN active DROP DEFAULT"
     )
 
     op.execute(
-        """
-DO $$
-BEGIN
-  IF EXISTS (SELECT 1 FROM pg_type WHERE typname = 'adminrole') THEN
-    DROP TYPE adminrole;
-  END IF;
-END
-$$;
-"""
+        "ALTER TABLE admin_users ALTER COLUMN role TYPE VARCHAR(50) USING role::text"
     )
 
+    op.execute("DROP TYPE IF EXISTS adminrole")
+
 
 def downgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    if not inspector.has_table("admin_users"):
+    inspector, snap = get_cached_inspector(op.get_bind())
+    if not snap.has_table("admin_users"):
         return
 
-    op.execute(
-        """
-DO $$
-BEGIN
-  IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'adminrole') THEN
-    CREATE TYPE adminrole AS ENUM ('Supervisor', 'Admin', 'SysAdmin', 'QC');
-  END IF;
-END
-$$;
-"""
-    )
+    if "adminrole" not in {enum["name"] for enum in inspector.get_enums()}:
+        op.execute(
+            "CREATE TYPE adminrole AS ENUM ('Supervisor', 'Admin', 'SysAdmin', 'QC')"
+        )
 
     op.execute(
         """
@@ -77,7 +61,6 @@ ALTER TABLE admin_users
 """
     )
 
-    existing_columns = {col["name"] for col in inspector.get_columns("admin_users")}
-    if "active" in existing_columns:
-        op.drop_column("admin_users", "active")
+    op.execute("ALTER TABLE admin_users DROP COLUMN IF EXISTS active")
+    snap.invalidate("admin_users")
 
@@ -6,7 +6,8 @@ Create Date: 2026-01-15
 """
 
 from alembic import op
-import sqlalchemy as sa
+
+from app.db.reflection import get_cached_inspector
 
 
 revision = "0018_remove_qc_skip_outcome"
@@ -16,9 +17,8 @@ depends_on = None
 
 
 def upgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    table_names = set(inspector.get_table_names())
+    _, snap = get_cached_inspector(op.get_bind())
+    table_names = snap.table_names
 
     if "qc_executions" in table_names:
         op.execute(
@@ -26,13 +26,18 @@ def upgrade() -> None:
         )
 
     if "qc_check_instances" in table_names and "qc_executions" in table_names:
+        # The referenced ids are collected once into a hashed set; the delete is
+        # then a single hash anti-join instead of an index probe per candidate.
         op.execute(
-            "DELETE FROM qc_check_instances "
-            "WHERE status::text = 'Closed' "
-            "AND origin::text = 'triggered' "
+            "WITH referenced AS MATERIALIZED ("
+            "    SELECT DISTINCT check_instance_id FROM qc_executions "
+            "    WHERE check_instance_id IS NOT NULL"
+            ") "
+            "DELETE FROM qc_check_instances c "
+            "WHERE c.status::text = 'Closed' "
+            "AND c.origin::text = 'triggered' "
             "AND NOT EXISTS ("
-            "    SELECT 1 FROM qc_executions "
-            "    WHERE qc_executions.check_instance_id = qc_check_instances.id"
+            "    SELECT 1 FROM referenced r WHERE r.check_instance_id = c.id"
             ")"
         )
 
@@ -6,7 +6,8 @@ Create Date: 2026-01-05
 """
 
 from alembic import op
-import sqlalchemy as sa
+
+from app.db.reflection import get_cached_inspector
 
 
 revision = "0019_admin_user_pin_length"
@@ -16,31 +17,25 @@ depends_on = None
 
 
 def upgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    if not inspector.has_table("admin_users"):
+    _, snap = get_cached_inspector(op.get_bind())
+    if not snap.has_table("admin_users"):
         return
 
-    existing_columns = {col["name"] for col in inspector.get_columns("admin_users")}
+    existing_columns = snap.columns("admin_users")
     if "pin" not in existing_columns:
         return
 
-    op.alter_column(
-        "admin_users",
-        "pin",
-        existing_type=sa.String(length=10),
-        type_=sa.String(length=32),
-        nullable=False,
-    )
+    # Widening a varchar is a catalog-only change; without a USING cast or a
+    # nullability reassertion Postgres skips both the rewrite and the scan.
+    op.execute("ALTER TABLE admin_users ALTER COLUMN pin TYPE VARCHAR(32)")
 
 
 def downgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    if not inspector.has_table("admin_users"):
+    _, snap = get_cached_inspector(op.get_bind())
+    if not snap.has_table("admin_users"):
         return
 
-    existing_columns = {col["name"] for col in inspector.get_columns("admin_users")}
+    existing_columns = snap.columns("admin_users")
     if "pin" not in existing_columns:
         return
 
@@ -41,27 +41,43 @@ TABLES_WITH_SEQUENCES = [
 ]
 
 
-def upgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-
-    for table_name in TABLES_WITH_SEQUENCES:
-        if not inspector.has_table(table_name):
-            continue
+# One fixed, parameterized statement: the catalog join keeps the listed tables
+# whose id column owns a sequence, and query_to_xml runs each MAX(id) on the
+# server, so neither the table list nor the SQL text is rebuilt client-side.
+_RESET_SEQUENCES_SQL = """
+SELECT setval(
+    pg_get_serial_sequence(c.relname::text, 'id'),
+    COALESCE(
+        (
+            xpath(
+                '/row/max_id/text()',
+                query_to_xml(
+                    format('SELECT MAX(id) AS max_id FROM %I', c.relname),
+                    false,
+                    true,
+                    ''
+                )
+            )
+        )[1]::text::bigint,
+        0
+    ) + 1,
+    false
+)
+FROM pg_class c
+JOIN pg_attribute a ON a.attrelid = c.oid
+WHERE c.relnamespace = current_schema()::regnamespace
+  AND c.relkind = 'r'
+  AND c.relname = ANY(:names)
+  AND a.attname = 'id'
+  AND NOT a.attisdropped
+  AND pg_get_serial_sequence(c.relname::text, 'id') IS NOT NULL
+"""
 
-        columns = {col["name"] for col in inspector.get_columns(table_name)}
-        if "id" not in columns:
-            continue
 
-        bind.execute(
-            sa.text(f"""
-                SELECT setval(
-                    pg_get_serial_sequence('{table_name}', 'id'),
-                    COALESCE((SELECT MAX(id) FROM {table_name}), 0) + 1,
-                    false
-                )
-            """)
-        )
+def upgrade() -> None:
+    op.get_bind().execute(
+        sa.text(_RESET_SEQUENCES_SQL), {"names": TABLES_WITH_SEQUENCES}
+    )
 
 
 def downgrade() -> None:
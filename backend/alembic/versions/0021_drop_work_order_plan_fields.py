@@ -6,7 +6,9 @@ Create Date: 2026-01-16
 """
 
 from alembic import op
-import sqlalchemy as sa
+
+from app.db.ddl_spec import batched_alter
+from app.db.reflection import get_cached_inspector
 
 
 revision = "0021_drop_work_order_plan_fields"
@@ -16,35 +18,25 @@ depends_on = None
 
 
 def upgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    columns = {col["name"] for col in inspector.get_columns("work_orders")}
-    index_names = {idx["name"] for idx in inspector.get_indexes("work_orders")}
-
-    if "ix_work_orders_planned_sequence" in index_names:
-        op.drop_index("ix_work_orders_planned_sequence", table_name="work_orders")
-    if "planned_sequence" in columns:
-        op.drop_column("work_orders", "planned_sequence")
-    if "planned_assembly_line" in columns:
-        op.drop_column("work_orders", "planned_assembly_line")
+    # Dropping planned_sequence takes its index with it.
+    batched_alter(
+        "work_orders",
+        "DROP COLUMN IF EXISTS planned_sequence",
+        "DROP COLUMN IF EXISTS planned_assembly_line",
+    )
+    _, snap = get_cached_inspector(op.get_bind())
+    snap.invalidate("work_orders")
 
 
 def downgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    columns = {col["name"] for col in inspector.get_columns("work_orders")}
-    index_names = {idx["name"] for idx in inspector.get_indexes("work_orders")}
-
-    if "planned_sequence" not in columns:
-        op.add_column(
-            "work_orders", sa.Column("planned_sequence", sa.Integer(), nullable=True)
-        )
-    if "planned_assembly_line" not in columns:
-        op.add_column(
-            "work_orders",
-            sa.Column("planned_assembly_line", sa.String(length=1), nullable=True),
-        )
-    if "ix_work_orders_planned_sequence" not in index_names:
-        op.create_index(
-            "ix_work_orders_planned_sequence", "work_orders", ["planned_sequence"]
-        )
+    batched_alter(
+        "work_orders",
+        "ADD COLUMN IF NOT EXISTS planned_sequence INTEGER",
+        "ADD COLUMN IF NOT EXISTS planned_assembly_line VARCHAR(1)",
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_work_orders_planned_sequence "
+        "ON work_orders (planned_sequence)"
+    )
+    _, snap = get_cached_inspector(op.get_bind())
+    snap.invalidate("work_orders")
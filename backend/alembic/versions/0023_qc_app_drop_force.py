@@ -6,7 +6,8 @@ Create Date: 2026-01-18
 """
 
 from alembic import op
-import sqlalchemy as sa
+
+from app.db.reflection import get_cached_inspector
 
 
 revision = "0023_qc_app_drop_force"
@@ -16,27 +17,19 @@ depends_on = None
 
 
 def upgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    table_names = set(inspector.get_table_names())
-    if "qc_applicability" not in table_names:
+    _, snap = get_cached_inspector(op.get_bind())
+    # Nothing to drop: skip the ALTER and its lock on an up-to-date database.
+    if "force_required" not in snap.columns("qc_applicability"):
         return
 
-    columns = {column["name"] for column in inspector.get_columns("qc_applicability")}
-    if "force_required" in columns:
-        op.drop_column("qc_applicability", "force_required")
+    op.execute("ALTER TABLE qc_applicability DROP COLUMN IF EXISTS force_required")
+    snap.invalidate("qc_applicability")
 
 
 def downgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    table_names = set(inspector.get_table_names())
-    if "qc_applicability" not in table_names:
-        return
-
-    columns = {column["name"] for column in inspector.get_columns("qc_applicability")}
-    if "force_required" not in columns:
-        op.add_column(
-            "qc_applicability",
-            sa.Column("force_required", sa.Boolean(), nullable=False, server_default=sa.false()),
-        )
+    op.execute(
+        "ALTER TABLE IF EXISTS qc_applicability "
+        "ADD COLUMN IF NOT EXISTS force_required BOOLEAN NOT NULL DEFAULT false"
+    )
+    _, snap = get_cached_inspector(op.get_bind())
+    snap.invalidate("qc_applicability")
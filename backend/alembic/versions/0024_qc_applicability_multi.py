@@ -8,6 +8,15 @@ Create Date: 2026-01-19
 from alembic import op
 import sqlalchemy as sa
 
+from app.db.ddl_spec import (
+    TableSpec,
+    batched_alter,
+    create_indexes,
+    create_tables,
+    unapply,
+)
+from app.db.reflection import get_cached_inspector
+
 
 revision = "0024_qc_applicability_multi"
 down_revision = "0023_qc_app_drop_force"
@@ -15,275 +24,184 @@ branch_labels = None
 depends_on = None
 
 
-def _drop_fk_if_exists(inspector: sa.Inspector, table: str, column: str) -> None:
-    for fk in inspector.get_foreign_keys(table):
-        if column in fk.get("constrained_columns", []):
-            if fk.get("name"):
-                op.drop_constraint(fk["name"], table, type_="foreignkey")
+_SCOPE_TABLES = [
+    TableSpec(
+        "qc_applicability_house_types",
+        columns=(
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("applicability_id", sa.Integer(), nullable=False),
+            sa.Column("house_type_id", sa.Integer(), nullable=False),
+        ),
+        indexes={
+            "ix_qc_app_house_types_applicability_id": ("applicability_id",),
+            "ix_qc_app_house_types_house_type_id": ("house_type_id",),
+        },
+        foreign_keys={
+            "applicability_id": "qc_applicability.id",
+            "house_type_id": "house_types.id",
+        },
+        on_delete={"applicability_id": "CASCADE", "house_type_id": "CASCADE"},
+        unique={"uq_qc_app_house_type": ("applicability_id", "house_type_id")},
+    ),
+    TableSpec(
+        "qc_applicability_sub_types",
+        columns=(
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("applicability_id", sa.Integer(), nullable=False),
+            sa.Column("sub_type_id", sa.Integer(), nullable=False),
+        ),
+        indexes={
+            "ix_qc_app_sub_types_applicability_id": ("applicability_id",),
+            "ix_qc_app_sub_types_sub_type_id": ("sub_type_id",),
+        },
+        foreign_keys={
+            "applicability_id": "qc_applicability.id",
+            "sub_type_id": "house_sub_types.id",
+        },
+        on_delete={"applicability_id": "CASCADE", "sub_type_id": "CASCADE"},
+        unique={"uq_qc_app_sub_type": ("applicability_id", "sub_type_id")},
+    ),
+    TableSpec(
+        "qc_applicability_panel_groups",
+        columns=(
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("applicability_id", sa.Integer(), nullable=False),
+            sa.Column("panel_group", sa.String(length=100), nullable=False),
+        ),
+        indexes={
+            "ix_qc_app_panel_groups_applicability_id": ("applicability_id",),
+            "ix_qc_app_panel_groups_panel_group": ("panel_group",),
+        },
+        foreign_keys={"applicability_id": "qc_applicability.id"},
+        on_delete={"applicability_id": "CASCADE"},
+        unique={"uq_qc_app_panel_group": ("applicability_id", "panel_group")},
+    ),
+]
+
+# (scope column, source expression, child table) for each legacy scope column.
+_BACKFILL_ARMS = (
+    ("house_type_id", "house_type_id", "qc_applicability_house_types"),
+    ("sub_type_id", "sub_type_id", "qc_applicability_sub_types"),
+    ("panel_group", "NULLIF(trim(panel_group), '')", "qc_applicability_panel_groups"),
+)
+
+
+def _backfill_sql(columns: frozenset[str]) -> str | None:
+    """Copy the legacy scope columns into the child tables in one statement.
+
+    The source CTE reads qc_applicability once; each present column fans out
+    through its own data-modifying CTE and the last arm is the outer INSERT.
+    """
+    arms = [arm for arm in _BACKFILL_ARMS if arm[0] in columns]
+    if not arms:
+        return None
+    source = ", ".join(
+        ["id"] + [f"{expression} AS {column}" for column, expression, _ in arms]
+    )
+    inserts = [
+        f"INSERT INTO {table} (applicability_id, {column}) "
+        f"SELECT id, {column} FROM src WHERE {column} IS NOT NULL "
+        "ON CONFLICT DO NOTHING"
+        for column, _, table in arms
+    ]
+    ctes = [f"src AS (SELECT {source} FROM qc_applicability)"] + [
+        f"i{position} AS ({insert} RETURNING 1)"
+        for position, insert in enumerate(inserts[:-1])
+    ]
+    return f"WITH {', '.join(ctes)} {inserts[-1]}"
+
+
+def _restore_sql(table_names: frozenset[str]) -> str | None:
+    """Fold the child tables back into the legacy columns in one UPDATE.
+
+    Each child table is aggregated per applicability and the aggregates are
+    full-joined, so qc_applicability is scanned and updated once; a column
+    without child rows keeps its current value.
+    """
+    arms = [arm for arm in _BACKFILL_ARMS if arm[2] in table_names]
+    if not arms:
+        return None
+    sources = " FULL JOIN ".join(
+        f"(SELECT applicability_id, MIN({column}) AS {column} "
+        f"FROM {table} GROUP BY applicability_id) AS {column}_src"
+        + (" USING (applicability_id)" if position else "")
+        for position, (column, _, table) in enumerate(arms)
+    )
+    assignments = ", ".join(
+        f"{column} = COALESCE(src.{column}, qa.{column})" for column, _, _ in arms
+    )
+    return (
+        f"UPDATE qc_applicability AS qa SET {assignments} "
+        f"FROM (SELECT * FROM {sources}) AS src "
+        "WHERE qa.id = src.applicability_id"
+    )
 
 
 def upgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    table_names = set(inspector.get_table_names())
+    _, snap = get_cached_inspector(op.get_bind())
+    table_names = snap.table_names
     if "qc_applicability" not in table_names:
         return
 
-    if "qc_applicability_house_types" not in table_names:
-        op.create_table(
-            "qc_applicability_house_types",
-            sa.Column("id", sa.Integer(), primary_key=True),
-            sa.Column(
-                "applicability_id",
-                sa.Integer(),
-                sa.ForeignKey("qc_applicability.id", ondelete="CASCADE"),
-                nullable=False,
-            ),
-            sa.Column(
-                "house_type_id",
-                sa.Integer(),
-                sa.ForeignKey("house_types.id", ondelete="CASCADE"),
-                nullable=False,
-            ),
-            sa.UniqueConstraint(
-                "applicability_id",
-                "house_type_id",
-                name="uq_qc_app_house_type",
-            ),
-        )
-        op.create_index(
-            "ix_qc_app_house_types_applicability_id",
-            "qc_applicability_house_types",
-            ["applicability_id"],
-        )
-        op.create_index(
-            "ix_qc_app_house_types_house_type_id",
-            "qc_applicability_house_types",
-            ["house_type_id"],
-        )
-
-    if "qc_applicability_sub_types" not in table_names:
-        op.create_table(
-            "qc_applicability_sub_types",
-            sa.Column("id", sa.Integer(), primary_key=True),
-            sa.Column(
-                "applicability_id",
-                sa.Integer(),
-                sa.ForeignKey("qc_applicability.id", ondelete="CASCADE"),
-                nullable=False,
-            ),
-            sa.Column(
-                "sub_type_id",
-                sa.Integer(),
-                sa.ForeignKey("house_sub_types.id", ondelete="CASCADE"),
-                nullable=False,
-            ),
-            sa.UniqueConstraint(
-                "applicability_id",
-                "sub_type_id",
-                name="uq_qc_app_sub_type",
-            ),
-        )
-        op.create_index(
-            "ix_qc_app_sub_types_applicability_id",
-            "qc_applicability_sub_types",
-            ["applicability_id"],
-        )
-        op.create_index(
-            "ix_qc_app_sub_types_sub_type_id",
-            "qc_applicability_sub_types",
-            ["sub_type_id"],
-        )
-
-    if "qc_applicability_panel_groups" not in table_names:
-        op.create_table(
-            "qc_applicability_panel_groups",
-            sa.Column("id", sa.Integer(), primary_key=True),
-            sa.Column(
-                "applicability_id",
-                sa.Integer(),
-                sa.ForeignKey("qc_applicability.id", ondelete="CASCADE"),
-                nullable=False,
-            ),
-            sa.Column("panel_group", sa.String(length=100), nullable=False),
-            sa.UniqueConstraint(
-                "applicability_id",
-                "panel_group",
-                name="uq_qc_app_panel_group",
-            ),
-        )
-        op.create_index(
-            "ix_qc_app_panel_groups_applicability_id",
-            "qc_applicability_panel_groups",
-            ["applicability_id"],
-        )
-        op.create_index(
-            "ix_qc_app_panel_groups_panel_group",
-            "qc_applicability_panel_groups",
-            ["panel_group"],
-        )
-
-    columns = {column["name"] for column in inspector.get_columns("qc_applicability")}
-    if "house_type_id" in columns:
-        op.execute(
-            sa.text(
-                """
-                INSERT INTO qc_applicability_house_types (applicability_id, house_type_id)
-                SELECT id, house_type_id
-                FROM qc_applicability
-                WHERE house_type_id IS NOT NULL
-                ON CONFLICT DO NOTHING
-                """
-            )
-        )
-    if "sub_type_id" in columns:
-        op.execute(
-            sa.text(
-                """
-                INSERT INTO qc_applicability_sub_types (applicability_id, sub_type_id)
-                SELECT id, sub_type_id
-                FROM qc_applicability
-                WHERE sub_type_id IS NOT NULL
-                ON CONFLICT DO NOTHING
-                """
-            )
-        )
-    if "panel_group" in columns:
-        op.execute(
-            sa.text(
-                """
-                INSERT INTO qc_applicability_panel_groups (applicability_id, panel_group)
-                SELECT id, trim(panel_group)
-                FROM qc_applicability
-                WHERE panel_group IS NOT NULL AND trim(panel_group) <> ''
-                ON CONFLICT DO NOTHING
-                """
-            )
-        )
+    # Already migrated: the scope tables exist and the legacy columns are gone.
+    columns = snap.columns("qc_applicability")
+    if all(spec.name in table_names for spec in _SCOPE_TABLES) and not any(
+        column in columns for column, _, _ in _BACKFILL_ARMS
+    ):
+        return
 
-    if "house_type_id" in columns:
-        _drop_fk_if_exists(inspector, "qc_applicability", "house_type_id")
-        op.drop_column("qc_applicability", "house_type_id")
-    if "sub_type_id" in columns:
-        _drop_fk_if_exists(inspector, "qc_applicability", "sub_type_id")
-        op.drop_column("qc_applicability", "sub_type_id")
-    if "panel_group" in columns:
-        op.drop_column("qc_applicability", "panel_group")
+    # Bulk-load pattern: create the tables (only their unique constraints, which
+    # ON CONFLICT needs), backfill them, then build the secondary indexes in one
+    # pass over the loaded rows instead of maintaining them row by row.
+    create_tables(_SCOPE_TABLES)
+    backfill_sql = _backfill_sql(columns)
+    if backfill_sql:
+        op.execute(sa.text(backfill_sql))
+    create_indexes(_SCOPE_TABLES)
+    for spec in _SCOPE_TABLES:
+        snap.invalidate(spec.name)
+
+    # Dropping the columns also drops their foreign keys.
+    batched_alter(
+        "qc_applicability",
+        "DROP COLUMN IF EXISTS house_type_id",
+        "DROP COLUMN IF EXISTS sub_type_id",
+        "DROP COLUMN IF EXISTS panel_group",
+    )
+    snap.invalidate("qc_applicability")
 
 
 def downgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    table_names = set(inspector.get_table_names())
+    _, snap = get_cached_inspector(op.get_bind())
+    table_names = snap.table_names
     if "qc_applicability" not in table_names:
         return
 
-    columns = {column["name"] for column in inspector.get_columns("qc_applicability")}
+    # The foreign keys are only added alongside a column that was missing.
+    columns = snap.columns("qc_applicability")
+    clauses = [
+        "ADD COLUMN IF NOT EXISTS house_type_id INTEGER",
+        "ADD COLUMN IF NOT EXISTS sub_type_id INTEGER",
+        "ADD COLUMN IF NOT EXISTS panel_group VARCHAR(100)",
+    ]
     if "house_type_id" not in columns:
-        op.add_column(
-            "qc_applicability",
-            sa.Column("house_type_id", sa.Integer(), nullable=True),
-        )
-        op.create_foreign_key(
-            "fk_qc_applicability_house_type_id",
-            "qc_applicability",
-            "house_types",
-            ["house_type_id"],
-            ["id"],
+        clauses.append(
+            "ADD CONSTRAINT fk_qc_applicability_house_type_id "
+            "FOREIGN KEY (house_type_id) REFERENCES house_types (id)"
         )
     if "sub_type_id" not in columns:
-        op.add_column(
-            "qc_applicability",
-            sa.Column("sub_type_id", sa.Integer(), nullable=True),
-        )
-        op.create_foreign_key(
-            "fk_qc_applicability_sub_type_id",
-            "qc_applicability",
-            "house_sub_types",
-            ["sub_type_id"],
-            ["id"],
-        )
-    if "panel_group" not in columns:
-        op.add_column(
-            "qc_applicability",
-            sa.Column("panel_group", sa.String(length=100), nullable=True),
-        )
-
-    if "qc_applicability_house_types" in table_names:
-        op.execute(
-            sa.text(
-                """
-                UPDATE qc_applicability AS qa
-                SET house_type_id = src.house_type_id
-                FROM (
-                    SELECT applicability_id, MIN(house_type_id) AS house_type_id
-                    FROM qc_applicability_house_types
-                    GROUP BY applicability_id
-                ) AS src
-                WHERE qa.id = src.applicability_id
-                """
-            )
-        )
-    if "qc_applicability_sub_types" in table_names:
-        op.execute(
-            sa.text(
-                """
-                UPDATE qc_applicability AS qa
-                SET sub_type_id = src.sub_type_id
-                FROM (
-                    SELECT applicability_id, MIN(sub_type_id) AS sub_type_id
-                    FROM qc_applicability_sub_types
-                    GROUP BY applicability_id
-                ) AS src
-                WHERE qa.id = src.applicability_id
-                """
-            )
+        clauses.append(
+            "ADD CONSTRAINT fk_qc_applicability_sub_type_id "
+            "FOREIGN KEY (sub_type_id) REFERENCES house_sub_types (id)"
         )
-    if "qc_applicability_panel_groups" in table_names:
-        op.execute(
-            sa.text(
-                """
-                UPDATE qc_applicability AS qa
-                SET panel_group = src.panel_group
-                FROM (
-                    SELECT applicability_id, MIN(panel_group) AS panel_group
-                    FROM qc_applicability_panel_groups
-                    GROUP BY applicability_id
-                ) AS src
-                WHERE qa.id = src.applicability_id
-                """
-            )
-        )
-
-    if "qc_applicability_panel_groups" in table_names:
-        op.drop_index(
-            "ix_qc_app_panel_groups_panel_group",
-            table_name="qc_applicability_panel_groups",
-        )
-        op.drop_index(
-            "ix_qc_app_panel_groups_applicability_id",
-            table_name="qc_applicability_panel_groups",
-        )
-        op.drop_table("qc_applicability_panel_groups")
+    batched_alter("qc_applicability", *clauses)
+    snap.invalidate("qc_applicability")
 
-    if "qc_applicability_sub_types" in table_names:
-        op.drop_index(
-            "ix_qc_app_sub_types_sub_type_id",
-            table_name="qc_applicability_sub_types",
-        )
-        op.drop_index(
-            "ix_qc_app_sub_types_applicability_id",
-            table_name="qc_applicability_sub_types",
-        )
-        op.drop_table("qc_applicability_sub_types")
+    restore_sql = _restore_sql(table_names)
+    if restore_sql:
+        op.execute(sa.text(restore_sql))
 
-    if "qc_applicability_house_types" in table_names:
-        op.drop_index(
-            "ix_qc_app_house_types_house_type_id",
-            table_name="qc_applicability_house_types",
-        )
-        op.drop_index(
-            "ix_qc_app_house_types_applicability_id",
-            table_name="qc_applicability_house_types",
-        )
-        op.drop_table("qc_applicability_house_types")
+    # One DROP TABLE for all three; their indexes go with them.
+    unapply(reversed(_SCOPE_TABLES))
+    for spec in _SCOPE_TABLES:
+        snap.invalidate(spec.name)
@@ -9,36 +9,26 @@ from alembic import op
 import sqlalchemy as sa
 from sqlalchemy.dialects import postgresql
 
+from app.db.ddl_spec import TableSpec, apply, unapply
+from app.db.reflection import get_cached_inspector
+
 
 revision = "0026_shift_estimates_cache"
 down_revision = "0025_merge_heads"
 branch_labels = None
 depends_on = None
 
+_STATION_ROLE_ENUM = postgresql.ENUM(
+    "Panels", "Magazine", "Assembly", "AUX", name="stationrole", create_type=False
+)
 
-def upgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    table_names = set(inspector.get_table_names())
-    if "shift_estimates" in table_names:
-        return
-
-    existing_enums = {enum["name"] for enum in inspector.get_enums()}
-    if "stationrole" not in existing_enums:
-        station_role_enum = postgresql.ENUM(
-            "Panels", "Magazine", "Assembly", "AUX", name="stationrole"
-        )
-        station_role_enum.create(bind)
-    station_role_enum = postgresql.ENUM(
-        "Panels", "Magazine", "Assembly", "AUX", name="stationrole", create_type=False
-    )
-
-    op.create_table(
-        "shift_estimates",
-        sa.Column("id", sa.Integer(), primary_key=True),
+_SHIFT_ESTIMATES = TableSpec(
+    "shift_estimates",
+    columns=(
+        sa.Column("id", sa.Integer(), nullable=False),
         sa.Column("date", sa.Date(), nullable=False),
         sa.Column("group_key", sa.String(length=64), nullable=False),
-        sa.Column("station_role", station_role_enum, nullable=False),
+        sa.Column("station_role", _STATION_ROLE_ENUM, nullable=False),
         sa.Column("station_id", sa.Integer(), nullable=True),
         sa.Column("sequence_order", sa.Integer(), nullable=True),
         sa.Column("assigned_count", sa.Integer(), nullable=False, server_default="0"),
@@ -55,23 +45,42 @@ def upgrade() -> None:
             server_default=sa.func.now(),
         ),
         sa.Column("algorithm_version", sa.Integer(), nullable=False, server_default="1"),
-        sa.UniqueConstraint(
+    ),
+    indexes={
+        "ix_shift_estimates_date": ("date",),
+        "ix_shift_estimates_group_key": ("group_key",),
+    },
+    unique={
+        "uq_shift_estimates_day_group_version": (
             "date",
             "group_key",
             "algorithm_version",
-            name="uq_shift_estimates_day_group_version",
         ),
+    },
+)
+
+
+def upgrade() -> None:
+    _, snap = get_cached_inspector(op.get_bind())
+    if snap.has_table("shift_estimates"):
+        return
+
+    # Create-or-ignore in one statement instead of listing every enum in pg_type.
+    op.execute(
+        "DO $$ BEGIN "
+        "CREATE TYPE stationrole AS ENUM ('Panels', 'Magazine', 'Assembly', 'AUX'); "
+        "EXCEPTION WHEN duplicate_object THEN NULL; "
+        "END $$"
     )
-    op.create_index("ix_shift_estimates_date", "shift_estimates", ["date"])
-    op.create_index("ix_shift_estimates_group_key", "shift_estimates", ["group_key"])
+    # The table, its unique constraint and both indexes in one DDL batch.
+    apply([_SHIFT_ESTIMATES])
+    snap.invalidate("shift_estimates")
 
 
 def downgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    table_names = set(inspector.get_table_names())
-    if "shift_estimates" not in table_names:
+    _, snap = get_cached_inspector(op.get_bind())
+    if not snap.has_table("shift_estimates"):
         return
-    op.drop_index("ix_shift_estimates_group_key", table_name="shift_estimates")
-    op.drop_index("ix_shift_estimates_date", table_name="shift_estimates")
-    op.drop_table("shift_estimates")
+    # The table drop takes its indexes with it.
+    unapply([_SHIFT_ESTIMATES])
+    snap.invalidate("shift_estimates")
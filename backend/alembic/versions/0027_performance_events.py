@@ -8,23 +8,19 @@ Create Date: 2026-02-11
 from alembic import op
 import sqlalchemy as sa
 
+from app.db.ddl_spec import TableSpec, apply, unapply
+from app.db.reflection import get_cached_inspector
+
 
 revision = "0027_performance_events"
 down_revision = "0026_shift_estimates_cache"
 branch_labels = None
 depends_on = None
 
-
-def upgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    table_names = set(inspector.get_table_names())
-    if "performance_events" in table_names:
-        return
-
-    op.create_table(
-        "performance_events",
-        sa.Column("id", sa.Integer(), primary_key=True),
+_PERFORMANCE_EVENTS = TableSpec(
+    "performance_events",
+    columns=(
+        sa.Column("id", sa.Integer(), nullable=False),
         sa.Column("created_at", sa.DateTime(), nullable=False),
         sa.Column("event_type", sa.String(length=32), nullable=False),
         sa.Column("page_path", sa.String(length=255), nullable=True),
@@ -39,30 +35,42 @@ def upgrade() -> None:
         sa.Column("device_name", sa.String(length=120), nullable=True),
         sa.Column("app_version", sa.String(length=64), nullable=True),
         sa.Column("session_id", sa.String(length=64), nullable=True),
-        sa.Column("sampled", sa.Boolean(), nullable=False, server_default=sa.text("true")),
-    )
-    op.create_index(
-        "ix_performance_events_created_at", "performance_events", ["created_at"]
-    )
-    op.create_index("ix_performance_events_event_type", "performance_events", ["event_type"])
-    op.create_index("ix_performance_events_page_path", "performance_events", ["page_path"])
-    op.create_index("ix_performance_events_api_path", "performance_events", ["api_path"])
-    op.create_index("ix_performance_events_request_id", "performance_events", ["request_id"])
-    op.create_index("ix_performance_events_device_id", "performance_events", ["device_id"])
-    op.create_index("ix_performance_events_session_id", "performance_events", ["session_id"])
+        sa.Column(
+            "sampled", sa.Boolean(), nullable=False, server_default=sa.text("true")
+        ),
+    ),
+    indexes={
+        "ix_performance_events_created_at": ("created_at",),
+        "ix_performance_events_event_type": ("event_type",),
+        "ix_performance_events_page_path": ("page_path",),
+        "ix_performance_events_api_path": ("api_path",),
+        "ix_performance_events_request_id": ("request_id",),
+        "ix_performance_events_device_id": ("device_id",),
+        "ix_performance_events_session_id": ("session_id",),
+    },
+)
+
+
+def upgrade() -> None:
+    _, snap = get_cached_inspector(op.get_bind())
+    if not snap.has_table("performance_events"):
+        # Empty table: the table and all of its indexes go out in one batch.
+        apply([_PERFORMANCE_EVENTS])
+        snap.invalidate("performance_events")
+        return
+
+    # A pre-existing table may already hold events, so any missing index is
+    # built concurrently instead of blocking writers.
+    index_names = snap.indexes("performance_events")
+    for name, columns in _PERFORMANCE_EVENTS.indexes.items():
+        if name not in index_names:
+            snap.create_index_concurrently(name, "performance_events", list(columns))
 
 
 def downgrade() -> None:
-    bind = op.get_bind()
-    inspector = sa.inspect(bind)
-    table_names = set(inspector.get_table_names())
-    if "performance_events" not in table_names:
+    _, snap = get_cached_inspector(op.get_bind())
+    if not snap.has_table("performance_events"):
         return
-    op.drop_index("ix_performance_events_session_id", table_name="performance_events")
-    op.drop_index("ix_performance_events_device_id", table_name="performance_events")
-    op.drop_index("ix_performance_events_request_id", table_name="performance_events")
-    op.drop_index("ix_performance_events_api_path", table_name="performance_events")
-    op.drop_index("ix_performance_events_page_path", table_name="performance_events")
-    op.drop_index("ix_performance_events_event_type", table_name="performance_events")
-    op.drop_index("ix_performance_events_created_at", table_name="performance_events")
-    op.drop_table("performance_events")
+    # The table drop takes its indexes with it.
+    unapply([_PERFORMANCE_EVENTS])
+    snap.invalidate("performance_events")
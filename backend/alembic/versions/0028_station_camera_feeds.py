@@ -8,6 +8,7 @@ Create Date: 2026-02-16
 from __future__ import annotations
 
 import re
+from types import MappingProxyType
 
 from alembic import op
 import sqlalchemy as sa
@@ -42,9 +43,23 @@ _STATION_NAME_ALIASES = {
     "precorte holzma aux": "precorte holzma",
 }
 
+# Aliases resolved up front so each station name needs a single lookup.
+_CAMERA_IP_BY_KEY = MappingProxyType(
+    {
+        **_CAMERA_IP_BY_STATION_NAME,
+        **{
+            alias: _CAMERA_IP_BY_STATION_NAME[target]
+            for alias, target in _STATION_NAME_ALIASES.items()
+        },
+    }
+)
+
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
 
 def _normalize_name(value: str) -> str:
-    return re.sub(r"\s+", " ", value.strip().lower())
+    return _WHITESPACE_RE.sub(" ", value.strip().lower())
 
 
 def _seed_camera_feed_ips(bind) -> None:
@@ -54,19 +69,30 @@ def _seed_camera_feed_ips(bind) -> None:
     if not station_rows:
         return
 
+    station_ids: list[int] = []
+    camera_feed_ips: list[str] = []
     for row in station_rows:
-        station_id = int(row["id"])
-        normalized_name = _normalize_name(str(row["name"]))
-        station_key = _STATION_NAME_ALIASES.get(normalized_name, normalized_name)
-        camera_feed_ip = _CAMERA_IP_BY_STATION_NAME.get(station_key)
+        camera_feed_ip = _CAMERA_IP_BY_KEY.get(_normalize_name(str(row["name"])))
         if not camera_feed_ip:
             continue
-        bind.execute(
-            sa.text(
-                "UPDATE stations SET camera_feed_ip = :camera_feed_ip WHERE id = :station_id"
-            ),
-            {"camera_feed_ip": camera_feed_ip, "station_id": station_id},
-        )
+        station_ids.append(int(row["id"]))
+        camera_feed_ips.append(camera_feed_ip)
+    if not station_ids:
+        return
+
+    # One UPDATE joined against the (id, ip) pairs instead of one per station.
+    bind.execute(
+        sa.text(
+            """
+            UPDATE stations AS s
+            SET camera_feed_ip = v.camera_feed_ip
+            FROM unnest(CAST(:station_ids AS integer[]), CAST(:camera_feed_ips AS text[]))
+                AS v(station_id, camera_feed_ip)
+            WHERE s.id = v.station_id
+            """
+        ),
+        {"station_ids": station_ids, "camera_feed_ips": camera_feed_ips},
+    )
 
 
 def upgrade() -> None:
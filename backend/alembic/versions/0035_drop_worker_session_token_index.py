@@ -0,0 +1,45 @@
+"""Drop the redundant non-unique worker session token index.
+
+Revision ID: 0035_drop_worker_session_token_index
+Revises: 0034_worker_adjusted_times
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0035_drop_worker_session_token_index"
+down_revision = "0034_worker_adjusted_times"
+branch_labels = None
+depends_on = None
+
+
+_TABLE = "worker_sessions"
+_INDEX_NAME = "ix_worker_sessions_token_hash"
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table(_TABLE):
+        return
+
+    # Only the plain index created by 0010 is redundant; databases built from the
+    # models carry a unique index under the same name and must keep it.
+    for index in inspector.get_indexes(_TABLE):
+        if index["name"] == _INDEX_NAME and not index["unique"]:
+            op.drop_index(_INDEX_NAME, table_name=_TABLE)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    if not inspector.has_table(_TABLE):
+        return
+
+    index_names = {index["name"] for index in inspector.get_indexes(_TABLE)}
+    if _INDEX_NAME not in index_names:
+        op.create_index(_INDEX_NAME, _TABLE, ["token_hash"])
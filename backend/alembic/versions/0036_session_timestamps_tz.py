@@ -0,0 +1,74 @@
+"""Store admin and worker session timestamps as timestamptz.
+
+Revision ID: 0036_session_timestamps_tz
+Revises: 0035_drop_worker_session_token_index
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.ddl_spec import batched_alter
+from app.db.reflection import get_cached_inspector
+
+
+revision = "0036_session_timestamps_tz"
+down_revision = "0035_drop_worker_session_token_index"
+branch_labels = None
+depends_on = None
+
+
+_TABLES = ("admin_sessions", "worker_sessions")
+_COLUMNS = ("created_at", "expires_at", "revoked_at")
+
+# Existing values are naive UTC; AT TIME ZONE 'UTC' reads them as such in both
+# directions, so the conversion never depends on the server's TimeZone.
+_COLUMN_TYPES_SQL = """
+SELECT table_name, column_name
+FROM information_schema.columns
+WHERE table_schema = current_schema()
+  AND table_name = ANY(:tables)
+  AND column_name = ANY(:columns)
+  AND data_type = :data_type
+"""
+
+
+def _columns_of_type(data_type: str) -> dict[str, list[str]]:
+    rows = op.get_bind().execute(
+        sa.text(_COLUMN_TYPES_SQL),
+        {"tables": list(_TABLES), "columns": list(_COLUMNS), "data_type": data_type},
+    )
+    columns: dict[str, list[str]] = {}
+    for table, column in rows:
+        columns.setdefault(table, []).append(column)
+    return columns
+
+
+def upgrade() -> None:
+    _, snap = get_cached_inspector(op.get_bind())
+    for table, columns in _columns_of_type("timestamp without time zone").items():
+        batched_alter(
+            table,
+            *(
+                f"ALTER COLUMN {column} TYPE TIMESTAMPTZ "
+                f"USING {column} AT TIME ZONE 'UTC'"
+                for column in columns
+            ),
+        )
+        snap.invalidate(table)
+
+
+def downgrade() -> None:
+    _, snap = get_cached_inspector(op.get_bind())
+    for table, columns in _columns_of_type("timestamp with time zone").items():
+        batched_alter(
+            table,
+            *(
+                f"ALTER COLUMN {column} TYPE TIMESTAMP "
+                f"USING {column} AT TIME ZONE 'UTC'"
+                for column in columns
+            ),
+        )
+        snap.invalidate(table)
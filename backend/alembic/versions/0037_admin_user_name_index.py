@@ -0,0 +1,33 @@
+"""Index admin users by name for login lookups.
+
+Revision ID: 0037_admin_user_name_index
+Revises: 0036_session_timestamps_tz
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+from app.db.reflection import get_cached_inspector
+
+
+revision = "0037_admin_user_name_index"
+down_revision = "0036_session_timestamps_tz"
+branch_labels = None
+depends_on = None
+
+
+_TABLE = "admin_users"
+_INDEX_NAME = "ix_admin_users_name"
+
+
+def upgrade() -> None:
+    _, snap = get_cached_inspector(op.get_bind())
+    if not snap.has_table(_TABLE) or _INDEX_NAME in snap.indexes(_TABLE):
+        return
+    snap.create_index_concurrently(_INDEX_NAME, _TABLE, ["first_name", "last_name"])
+
+
+def downgrade() -> None:
+    op.execute(f"DROP INDEX IF EXISTS {_INDEX_NAME}")
@@ -0,0 +1,54 @@
+"""Replace the worker_sessions worker_id index with a covering lookup index.
+
+Revision ID: 0038_worker_session_lookup_index
+Revises: 0037_admin_user_name_index
+Create Date: 2026-10-17
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+from app.db.reflection import get_cached_inspector
+
+
+revision = "0038_worker_session_lookup_index"
+down_revision = "0037_admin_user_name_index"
+branch_labels = None
+depends_on = None
+
+
+_TABLE = "worker_sessions"
+_LOOKUP_INDEX = "ix_worker_sessions_worker_lookup"
+_WORKER_ID_INDEX = "ix_worker_sessions_worker_id"
+
+
+def upgrade() -> None:
+    _, snap = get_cached_inspector(op.get_bind())
+    if not snap.has_table(_TABLE):
+        return
+
+    # Per-worker session lookups read only these columns, so the covering index
+    # serves them as index-only scans. ix_worker_sessions_station_id stays for
+    # station lookups.
+    with op.get_context().autocommit_block():
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {_LOOKUP_INDEX} "
+            f"ON {_TABLE} (worker_id) INCLUDE (station_id, expires_at, revoked_at)"
+        )
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {_WORKER_ID_INDEX}")
+    snap.invalidate(_TABLE)
+
+
+def downgrade() -> None:
+    _, snap = get_cached_inspector(op.get_bind())
+    if not snap.has_table(_TABLE):
+        return
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {_WORKER_ID_INDEX} "
+            f"ON {_TABLE} (worker_id)"
+        )
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {_LOOKUP_INDEX}")
+    snap.invalidate(_TABLE)
@@ -1,10 +1,21 @@
+"""Request dependencies: database session, clock and admin/worker authentication.
+
+Session lookups are cached per process for _SESSION_CACHE_TTL_SECONDS (5s).
+Logout evicts the entry only in the process that handled it, so with several
+workers a logged-out or revoked session can keep authenticating in the other
+processes for up to 5 seconds. Owner rows (active flag, role) are never
+cached: other processes cannot see a deactivation or role change, and on a
+session cache hit the owner is a single primary-key read.
+"""
+
 from collections.abc import Generator
-from datetime import datetime, timezone
+from datetime import datetime
 
 from fastapi import Depends, HTTPException, Request, status
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
+from app.core.cache import TTLCache
 from app.core.security import hash_token, utc_now
 from app.db.session import SessionLocal
 from app.models.admin import AdminSession, AdminUser
@@ -14,11 +25,44 @@ ADMIN_SESSION_COOKIE = "admin_session"
 WORKER_SESSION_COOKIE = "worker_session"
 
 
-def _ensure_aware(dt: datetime) -> datetime:
-    """Convert naive datetime to UTC-aware. Assumes naive datetimes are UTC."""
-    if dt.tzinfo is None:
-        return dt.replace(tzinfo=timezone.utc)
-    return dt
+# Recently validated sessions, keyed by token hash and holding
+# (owner id, expires_at). A hit skips the session lookup only; the owner row is
+# always read, so deactivation and role changes apply on the next request.
+_SESSION_CACHE_TTL_SECONDS = 5
+_admin_session_cache: TTLCache[str, tuple[int, datetime]] = TTLCache(
+    maxsize=10_000, ttl=_SESSION_CACHE_TTL_SECONDS
+)
+_worker_session_cache: TTLCache[str, tuple[int, datetime]] = TTLCache(
+    maxsize=10_000, ttl=_SESSION_CACHE_TTL_SECONDS
+)
+
+
+def _cached_session_owner(
+    cache: TTLCache[str, tuple[int, datetime]], token_hash: str, now: datetime
+) -> int | None:
+    entry = cache.get(token_hash)
+    if entry is None:
+        return None
+    owner_id, expires_at = entry
+    if expires_at <= now:
+        return None
+    return owner_id
+
+
+def forget_admin_session(session: AdminSession) -> None:
+    _admin_session_cache.pop(session.token_hash)
+
+
+def forget_worker_session(session: WorkerSession) -> None:
+    _worker_session_cache.pop(session.token_hash)
+
+
+def get_now(request: Request) -> datetime:
+    """Current UTC time, read once per request and shared by its dependencies."""
+    now = getattr(request.state, "now", None)
+    if now is None:
+        now = request.state.now = utc_now()
+    return now
 
 
 def get_db() -> Generator:
@@ -29,18 +73,47 @@ def get_db() -> Generator:
         db.close()
 
 
+def get_db_keep_loaded(db: Session = Depends(get_db)) -> Session:
+    """The request session, with rows kept loaded across commit.
+
+    For write routes whose models have no server-generated columns besides the
+    primary key (which flush already returns) and whose response schemas read
+    no relationships: they can serialize what they committed without a
+    refresh SELECT.
+    """
+    db.expire_on_commit = False
+    return db
+
+
 def get_current_admin(
-    request: Request, db: Session = Depends(get_db)
+    request: Request,
+    db: Session = Depends(get_db),
+    now: datetime = Depends(get_now),
 ) -> AdminUser:
     token = request.cookies.get(ADMIN_SESSION_COOKIE)
     if not token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
-    token_hash = hash_token(token)
-    stmt = select(AdminSession).where(AdminSession.token_hash == token_hash)
-    session = db.execute(stmt).scalar_one_or_none()
-    if not session or session.revoked_at is not None or _ensure_aware(session.expires_at) <= utc_now():
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session expired")
-    admin = db.get(AdminUser, session.admin_user_id)
+    token_hash = request.state.admin_token_hash = hash_token(token)
+    admin_user_id = _cached_session_owner(_admin_session_cache, token_hash, now)
+    if admin_user_id is not None:
+        admin = db.get(AdminUser, admin_user_id)
+    else:
+        # Session and user in one round-trip; the outer join keeps a session
+        # whose user is gone so it still reports "Admin user not found".
+        stmt = (
+            select(AdminSession, AdminUser)
+            .outerjoin(AdminUser, AdminUser.id == AdminSession.admin_user_id)
+            .where(
+                AdminSession.token_hash == token_hash,
+                AdminSession.revoked_at.is_(None),
+                AdminSession.expires_at > func.now(),
+            )
+        )
+        session, admin = db.execute(stmt).first() or (None, None)
+        if not session:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session expired")
+        request.state.admin_session = session
+        _admin_session_cache.set(token_hash, (session.admin_user_id, session.expires_at))
     if not admin:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Admin user not found")
     if not getattr(admin, "active", True):
@@ -50,30 +123,65 @@ def get_current_admin(
 
 def _get_worker_session(token: str, db: Session) -> WorkerSession:
     token_hash = hash_token(token)
-    stmt = select(WorkerSession).where(WorkerSession.token_hash == token_hash)
+    stmt = select(WorkerSession).where(
+        WorkerSession.token_hash == token_hash,
+        WorkerSession.revoked_at.is_(None),
+        WorkerSession.expires_at > func.now(),
+    )
     session = db.execute(stmt).scalar_one_or_none()
-    if not session or session.revoked_at is not None or _ensure_aware(session.expires_at) <= utc_now():
+    if not session:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session expired")
+    _worker_session_cache.set(token_hash, (session.worker_id, session.expires_at))
     return session
 
 
+def _get_session_worker(request: Request, db: Session, now: datetime) -> Worker | None:
+    """Worker behind the request's session token, loading both in one query on a
+    cache miss. A session row loaded here is kept on request.state for
+    get_current_worker_session."""
+    token = request.cookies.get(WORKER_SESSION_COOKIE)
+    if not token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    token_hash = hash_token(token)
+    worker_id = _cached_session_owner(_worker_session_cache, token_hash, now)
+    if worker_id is not None:
+        return db.get(Worker, worker_id)
+    stmt = (
+        select(WorkerSession, Worker)
+        .outerjoin(Worker, Worker.id == WorkerSession.worker_id)
+        .where(
+            WorkerSession.token_hash == token_hash,
+            WorkerSession.revoked_at.is_(None),
+            WorkerSession.expires_at > func.now(),
+        )
+    )
+    session, worker = db.execute(stmt).first() or (None, None)
+    if not session:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Session expired")
+    request.state.worker_session = session
+    _worker_session_cache.set(token_hash, (session.worker_id, session.expires_at))
+    return worker
+
+
 def get_current_worker_session(
     request: Request, db: Session = Depends(get_db)
 ) -> WorkerSession:
+    session = getattr(request.state, "worker_session", None)
+    if session is not None:
+        return session
     token = request.cookies.get(WORKER_SESSION_COOKIE)
     if not token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
-    return _get_worker_session(token, db)
+    session = request.state.worker_session = _get_worker_session(token, db)
+    return session
 
 
 def get_current_worker(
-    request: Request, db: Session = Depends(get_db)
+    request: Request,
+    db: Session = Depends(get_db),
+    now: datetime = Depends(get_now),
 ) -> Worker:
-    token = request.cookies.get(WORKER_SESSION_COOKIE)
-    if not token:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
-    session = _get_worker_session(token, db)
-    worker = db.get(Worker, session.worker_id)
+    worker = _get_session_worker(request, db, now)
     if not worker:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Worker not found")
     if not worker.active:
@@ -82,16 +190,14 @@ def get_current_worker(
 
 
 def get_optional_worker(
-    request: Request, db: Session = Depends(get_db)
+    request: Request,
+    db: Session = Depends(get_db),
+    now: datetime = Depends(get_now),
 ) -> Worker | None:
-    token = request.cookies.get(WORKER_SESSION_COOKIE)
-    if not token:
-        return None
     try:
-        session = _get_worker_session(token, db)
+        worker = _get_session_worker(request, db, now)
     except HTTPException:
         return None
-    worker = db.get(Worker, session.worker_id)
     if not worker or not worker.active:
         return None
     return worker
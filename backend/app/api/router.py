@@ -1,95 +1,93 @@
+from __future__ import annotations
+
+import functools
+import importlib
+import inspect
+
 from fastapi import APIRouter
+from fastapi.routing import APIRoute
+
+from app.api.deps import get_db
+from app.core.config import settings
 
-from app.api.routes import (
-    admin_auth,
-    admin_users,
-    backups,
-    camera_feed,
-    comment_templates,
-    geovictoria,
-    house_params,
-    house_types,
-    panel_definitions,
-    panel_linear_meters,
-    panel_task_history,
-    reports,
-    task_station_adherence,
-    task_history,
-    station_panels_finished,
-    pause_reasons,
-    pause_summary,
-    production_queue,
-    qc_config,
-    qc_runtime,
-    shift_estimates,
-    stations,
-    task_analysis,
-    task_footage,
-    task_definitions,
-    task_rules,
-    worker_sessions,
-    worker_station,
-    worker_tasks,
-    workers,
+# (route module, prefix, tag) in registration order; modules sharing a prefix
+# (/admin, /qc) are matched in this order.
+_ROUTES: tuple[tuple[str, str, str], ...] = (
+    ("admin_auth", "/admin", "admin-auth"),
+    ("admin_users", "/admin", "admin-users"),
+    ("backups", "/backups", "backups"),
+    ("camera_feed", "/camera-feed", "camera-feed"),
+    ("geovictoria", "/geovictoria", "geovictoria"),
+    ("workers", "/workers", "workers"),
+    ("stations", "/stations", "stations"),
+    ("pause_reasons", "/pause-reasons", "pause-reasons"),
+    ("comment_templates", "/comment-templates", "comment-templates"),
+    ("qc_config", "/qc", "qc-config"),
+    ("qc_runtime", "/qc", "qc-runtime"),
+    ("house_types", "/house-types", "house-types"),
+    ("panel_definitions", "/panel-definitions", "panel-definitions"),
+    ("panel_linear_meters", "/panel-linear-meters", "panel-linear-meters"),
+    ("panel_task_history", "/panel-task-history", "panel-task-history"),
+    ("reports", "/reports", "reports"),
+    ("task_station_adherence", "/task-station-adherence", "task-station-adherence"),
+    ("task_history", "/task-history", "task-history"),
+    ("station_panels_finished", "/station-panels-finished", "station-panels-finished"),
+    ("shift_estimates", "/shift-estimates", "shift-estimates"),
+    ("house_params", "/house-parameters", "house-parameters"),
+    ("task_definitions", "/task-definitions", "task-definitions"),
+    ("task_rules", "/task-rules", "task-rules"),
+    ("task_analysis", "/task-analysis", "task-analysis"),
+    ("task_footage", "/task-footage", "task-footage"),
+    ("pause_summary", "/pause-summary", "pause-summary"),
+    ("production_queue", "/production-queue", "production-queue"),
+    ("worker_sessions", "/worker-sessions", "worker-sessions"),
+    ("worker_station", "/worker-stations", "worker-stations"),
+    ("worker_tasks", "/worker-tasks", "worker-tasks"),
 )
 
-api_router = APIRouter()
 
-api_router.include_router(admin_auth.router, prefix="/admin", tags=["admin-auth"])
-api_router.include_router(admin_users.router, prefix="/admin", tags=["admin-users"])
-api_router.include_router(backups.router, prefix="/backups", tags=["backups"])
-api_router.include_router(camera_feed.router, prefix="/camera-feed", tags=["camera-feed"])
-api_router.include_router(geovictoria.router, prefix="/geovictoria", tags=["geovictoria"])
-api_router.include_router(workers.router, prefix="/workers", tags=["workers"])
-api_router.include_router(stations.router, prefix="/stations", tags=["stations"])
-api_router.include_router(pause_reasons.router, prefix="/pause-reasons", tags=["pause-reasons"])
-api_router.include_router(comment_templates.router, prefix="/comment-templates", tags=["comment-templates"])
-api_router.include_router(qc_config.router, prefix="/qc", tags=["qc-config"])
-api_router.include_router(qc_runtime.router, prefix="/qc", tags=["qc-runtime"])
-api_router.include_router(house_types.router, prefix="/house-types", tags=["house-types"])
-api_router.include_router(
-    panel_definitions.router, prefix="/panel-definitions", tags=["panel-definitions"]
-)
-api_router.include_router(
-    panel_linear_meters.router,
-    prefix="/panel-linear-meters",
-    tags=["panel-linear-meters"],
-)
-api_router.include_router(
-    panel_task_history.router,
-    prefix="/panel-task-history",
-    tags=["panel-task-history"],
-)
-api_router.include_router(reports.router, prefix="/reports", tags=["reports"])
-api_router.include_router(
-    task_station_adherence.router,
-    prefix="/task-station-adherence",
-    tags=["task-station-adherence"],
-)
-api_router.include_router(
-    task_history.router,
-    prefix="/task-history",
-    tags=["task-history"],
-)
-api_router.include_router(
-    station_panels_finished.router,
-    prefix="/station-panels-finished",
-    tags=["station-panels-finished"],
-)
-api_router.include_router(
-    shift_estimates.router,
-    prefix="/shift-estimates",
-    tags=["shift-estimates"],
-)
-api_router.include_router(
-    house_params.router, prefix="/house-parameters", tags=["house-parameters"]
-)
-api_router.include_router(task_definitions.router, prefix="/task-definitions", tags=["task-definitions"])
-api_router.include_router(task_rules.router, prefix="/task-rules", tags=["task-rules"])
-api_router.include_router(task_analysis.router, prefix="/task-analysis", tags=["task-analysis"])
-api_router.include_router(task_footage.router, prefix="/task-footage", tags=["task-footage"])
-api_router.include_router(pause_summary.router, prefix="/pause-summary", tags=["pause-summary"])
-api_router.include_router(production_queue.router, prefix="/production-queue", tags=["production-queue"])
-api_router.include_router(worker_sessions.router, prefix="/worker-sessions", tags=["worker-sessions"])
-api_router.include_router(worker_station.router, prefix="/worker-stations", tags=["worker-stations"])
-api_router.include_router(worker_tasks.router, prefix="/worker-tasks", tags=["worker-tasks"])
+# Route modules whose endpoints all make blocking HTTP calls.
+_BLOCKING_HTTP_MODULES = frozenset({"app.api.routes.geovictoria"})
+
+
+def _check_blocking_endpoints(router: APIRouter) -> None:
+    """Reject `async def` endpoints that do blocking I/O in their own body.
+
+    Sessions and the GeoVictoria client are synchronous. FastAPI runs plain
+    `def` endpoints on its threadpool, but awaits `async def` ones on the event
+    loop, where every blocking query would stall all other requests. Async
+    endpoints are fine when their blocking work stays in sync dependencies
+    (admin_me), so only a direct get_db dependency or a GeoVictoria endpoint
+    is rejected.
+    """
+    for route in router.routes:
+        if not isinstance(route, APIRoute):
+            continue
+        if not inspect.iscoroutinefunction(route.endpoint):
+            continue
+        if route.endpoint.__module__ in _BLOCKING_HTTP_MODULES or any(
+            dependency.call is get_db for dependency in route.dependant.dependencies
+        ):
+            raise TypeError(
+                f"{route.endpoint.__module__}.{route.endpoint.__name__} does blocking "
+                "I/O and must be declared with def, not async def"
+            )
+
+
+@functools.cache
+def build_api_router(modules: frozenset[str] | None = None) -> APIRouter:
+    """Import and mount the route modules, or only `modules` when given.
+
+    Modules left out of the subset are never imported.
+    """
+    router = APIRouter()
+    for module_name, prefix, tag in _ROUTES:
+        if modules is not None and module_name not in modules:
+            continue
+        module = importlib.import_module(f"app.api.routes.{module_name}")
+        router.include_router(module.router, prefix=prefix, tags=[tag])
+    _check_blocking_endpoints(router)
+    return router
+
+
+api_router = build_api_router(settings.api_route_modules)
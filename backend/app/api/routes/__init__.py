@@ -1,34 +1,7 @@
-from app.api.routes import (
-    admin_auth,
-    admin_users,
-    backups,
-    camera_feed,
-    comment_templates,
-    geovictoria,
-    house_params,
-    house_types,
-    panel_definitions,
-    panel_linear_meters,
-    panel_task_history,
-    reports,
-    task_station_adherence,
-    task_history,
-    station_panels_finished,
-    pause_reasons,
-    pause_summary,
-    production_queue,
-    qc_config,
-    qc_runtime,
-    shift_estimates,
-    stations,
-    task_analysis,
-    task_definitions,
-    task_rules,
-    worker_sessions,
-    worker_station,
-    worker_tasks,
-    workers,
-)
+"""Route modules are imported on first attribute access (PEP 562), so importing
+one of them, or mounting a subset in app.api.router, doesn't load the rest."""
+
+import importlib
 
 __all__ = [
     "admin_auth",
@@ -61,3 +34,13 @@ __all__ = [
     "worker_tasks",
     "workers",
 ]
+
+
+def __getattr__(name: str):
+    if name in __all__:
+        return importlib.import_module(f"{__name__}.{name}")
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -1,10 +1,24 @@
+import hmac
+from datetime import datetime
+
 from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
-from app.api.deps import ADMIN_SESSION_COOKIE, get_current_admin, get_db
+from app.api.deps import (
+    ADMIN_SESSION_COOKIE,
+    forget_admin_session,
+    get_current_admin,
+    get_db,
+    get_now,
+)
 from app.core.config import settings
-from app.core.security import hash_token, new_session_token, session_expiry, utc_now
+from app.core.security import (
+    SESSION_TTL_SECONDS,
+    hash_token,
+    new_session_token,
+    session_expiry,
+)
 from app.models.admin import AdminSession, AdminUser
 from app.schemas.admin import AdminLoginRequest, AdminUserRead
 from app.services.admin_bootstrap import SYSADMIN_FIRST_NAME, ensure_sysadmin_user
@@ -33,13 +47,21 @@ def _authenticate_admin_user(
             )
         admin = ensure_sysadmin_user(db)
     else:
-        stmt = (
-            select(AdminUser)
-            .where(AdminUser.first_name == normalized_first_name)
-            .where(AdminUser.last_name == normalized_last_name)
-            .where(AdminUser.pin == normalized_pin)
+        # Index lookup on the name; the PIN is compared in constant time.
+        stmt = select(AdminUser).where(
+            AdminUser.first_name == normalized_first_name,
+            AdminUser.last_name == normalized_last_name,
+        )
+        admin = next(
+            (
+                candidate
+                for candidate in db.execute(stmt).scalars()
+                if hmac.compare_digest(
+                    candidate.pin.encode("utf-8"), normalized_pin.encode("utf-8")
+                )
+            ),
+            None,
         )
-        admin = db.execute(stmt).scalar_one_or_none()
         if not admin:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials"
@@ -55,15 +77,18 @@ def _authenticate_admin_user(
 
 @router.post("/login", response_model=AdminUserRead)
 def admin_login(
-    payload: AdminLoginRequest, response: Response, db: Session = Depends(get_db)
+    payload: AdminLoginRequest,
+    response: Response,
+    db: Session = Depends(get_db),
+    now: datetime = Depends(get_now),
 ) -> AdminUser:
     admin = _authenticate_admin_user(payload, db, allow_inactive=True)
     token = new_session_token()
-    expires_at = session_expiry()
+    expires_at = session_expiry(now=now)
     session = AdminSession(
         admin_user_id=admin.id,
         token_hash=hash_token(token),
-        created_at=utc_now(),
+        created_at=now,
         expires_at=expires_at,
     )
     db.add(session)
@@ -73,7 +98,7 @@ def admin_login(
         value=token,
         httponly=True,
         samesite="lax",
-        max_age=int((expires_at - utc_now()).total_seconds()),
+        max_age=SESSION_TTL_SECONDS,
         path="/",
     )
     return admin
@@ -92,18 +117,24 @@ def admin_logout(
     response: Response,
     admin: AdminUser = Depends(get_current_admin),
     db: Session = Depends(get_db),
+    now: datetime = Depends(get_now),
 ) -> None:
-    token = request.cookies.get(ADMIN_SESSION_COOKIE)
-    if token:
-        token_hash = hash_token(token)
-        stmt = select(AdminSession).where(AdminSession.token_hash == token_hash)
+    # get_current_admin already hashed the cookie, and on a session cache miss
+    # it also loaded the session row.
+    session = getattr(request.state, "admin_session", None)
+    if session is None:
+        stmt = select(AdminSession).where(
+            AdminSession.token_hash == request.state.admin_token_hash
+        )
         session = db.execute(stmt).scalar_one_or_none()
-        if session and session.revoked_at is None:
-            session.revoked_at = utc_now()
+    if session:
+        forget_admin_session(session)
+        if session.revoked_at is None:
+            session.revoked_at = now
             db.commit()
     response.delete_cookie(ADMIN_SESSION_COOKIE, path="/")
 
 
 @router.get("/me", response_model=AdminUserRead)
-def admin_me(admin: AdminUser = Depends(get_current_admin)) -> AdminUser:
+async def admin_me(admin: AdminUser = Depends(get_current_admin)) -> AdminUser:
     return admin
@@ -45,17 +45,11 @@ def list_admin_roles(
     _admin: AdminUser = Depends(get_current_admin),
     db: Session = Depends(get_db),
 ) -> list[str]:
-    known = [role.value for role in AdminRole]
-    rows = db.execute(select(func.distinct(AdminUser.role))).scalars().all()
-    dynamic = [row for row in rows if row]
-    merged: list[str] = []
-    for role in known + dynamic:
-        normalized = str(role).strip()
-        if not normalized:
-            continue
-        if normalized not in merged:
-            merged.append(normalized)
-    return merged
+    trimmed = func.trim(AdminUser.role)
+    rows = db.execute(
+        select(trimmed).distinct().where(trimmed != "").order_by(trimmed)
+    ).scalars()
+    return list(dict.fromkeys([role.value for role in AdminRole] + list(rows)))
 
 
 @router.post("/users", response_model=AdminUserRead, status_code=status.HTTP_201_CREATED)
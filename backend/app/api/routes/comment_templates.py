@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_admin, get_db
+from app.api.deps import get_current_admin, get_db, get_db_keep_loaded
+from app.db.session import with_strict_loading
 from app.models.admin import AdminUser
 from app.models.admin import CommentTemplate
 from app.models.stations import Station
@@ -19,12 +20,13 @@ def _validate_station_ids(
     db: Session,
     station_ids: list[int] | None,
 ) -> None:
-    if station_ids is None:
-        return
     if not station_ids:
         return
-    stations = list(db.execute(select(Station.id).where(Station.id.in_(station_ids))).scalars())
-    if len(stations) != len(set(station_ids)):
+    unique_ids = set(station_ids)
+    count = db.execute(
+        select(func.count()).select_from(Station).where(Station.id.in_(unique_ids))
+    ).scalar_one()
+    if count != len(unique_ids):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="One or more stations not found",
@@ -32,21 +34,31 @@ def _validate_station_ids(
 
 
 @router.get("", response_model=list[CommentTemplateRead])
-def list_comment_templates(db: Session = Depends(get_db)) -> list[CommentTemplate]:
-    return list(db.execute(select(CommentTemplate).order_by(CommentTemplate.text)).scalars())
+def list_comment_templates(
+    limit: int | None = Query(default=None, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    db: Session = Depends(get_db),
+) -> list[CommentTemplate]:
+    stmt = with_strict_loading(
+        select(CommentTemplate).order_by(CommentTemplate.text, CommentTemplate.id)
+    )
+    if offset:
+        stmt = stmt.offset(offset)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return db.scalars(stmt).all()
 
 
 @router.post("", response_model=CommentTemplateRead, status_code=status.HTTP_201_CREATED)
 def create_comment_template(
     payload: CommentTemplateCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_keep_loaded),
     _admin: AdminUser = Depends(get_current_admin),
 ) -> CommentTemplate:
     _validate_station_ids(db, payload.applicable_station_ids)
     template = CommentTemplate(**payload.model_dump())
     db.add(template)
     db.commit()
-    db.refresh(template)
     return template
 
 
@@ -66,7 +78,7 @@ def get_comment_template(
 def update_comment_template(
     template_id: int,
     payload: CommentTemplateUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_keep_loaded),
     _admin: AdminUser = Depends(get_current_admin),
 ) -> CommentTemplate:
     template = db.get(CommentTemplate, template_id)
@@ -80,7 +92,6 @@ def update_comment_template(
     for key, value in updates.items():
         setattr(template, key, value)
     db.commit()
-    db.refresh(template)
     return template
 
 
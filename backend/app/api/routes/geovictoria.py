@@ -1,9 +1,13 @@
 from __future__ import annotations
 
-import time
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 import logging
 import re
+import threading
+import time
 from typing import Any, Mapping
 
 import httpx
@@ -23,6 +27,35 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 
 _TOKEN_CACHE: dict[str, object] = {"token": None, "expires_at": 0.0}
+_TOKEN_LOCK = threading.Lock()
+_TOKEN_REFRESH_SKEW_SECONDS = 30
+# Normalized /User/List result and its lookup index, shared by the worker
+# endpoints. The lock keeps concurrent misses down to one upstream fetch per
+# process.
+_USERS_CACHE: dict[str, object] = {"index": None, "expires_at": 0.0}
+_USERS_LOCK = threading.Lock()
+
+_USER_LIST_KEYS = ("Data", "Users", "Lista")
+_ID_KEYS = ("Id", "ID", "UserId", "UserID")
+_TRUTHY = frozenset({"true", "1", "yes", "y", "si", "s"})
+_FALSY = frozenset({"false", "0", "no", "n"})
+
+# One pooled client per process so repeated calls reuse kept-alive TLS
+# connections instead of handshaking on every request.
+_BASE_URL = settings.geovictoria_base_url.rstrip("/")
+_LOGIN_PATH = "/Login"
+_USER_LIST_PATH = "/User/List"
+_CLIENT = httpx.Client(
+    base_url=_BASE_URL,
+    timeout=httpx.Timeout(30.0),
+    limits=httpx.Limits(max_keepalive_connections=10, max_connections=20),
+)
+atexit.register(_CLIENT.close)
+
+# Runs independent GeoVictoria calls of one request side by side; they share
+# _CLIENT's connection pool.
+_GEO_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="geovictoria")
+atexit.register(_GEO_EXECUTOR.shutdown, wait=False)
 
 
 def _require_credentials() -> tuple[str, str]:
@@ -36,52 +69,70 @@ def _require_credentials() -> tuple[str, str]:
     return user, password
 
 
-def _get_token() -> str:
-    user, password = _require_credentials()
-    now = time.time()
+def _cached_token() -> str | None:
     token = _TOKEN_CACHE.get("token")
     expires_at = _TOKEN_CACHE.get("expires_at", 0.0)
-    if isinstance(token, str) and isinstance(expires_at, (int, float)) and expires_at > now:
+    if isinstance(token, str) and isinstance(expires_at, (int, float)) and expires_at > time.time():
         return token
-    try:
-        resp = httpx.post(
-            f"{settings.geovictoria_base_url}/Login",
-            json={"User": user, "Password": password},
-            timeout=30,
-        )
-        resp.raise_for_status()
-    except httpx.HTTPError as exc:
-        raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail=f"GeoVictoria auth failed: {exc}",
-        ) from exc
-    payload = resp.json()
-    token = payload.get("token")
-    if not token:
-        raise HTTPException(
-            status_code=status.HTTP_502_BAD_GATEWAY,
-            detail="GeoVictoria auth did not return a token",
+    return None
+
+
+def _get_token() -> str:
+    user, password = _require_credentials()
+    token = _cached_token()
+    if token:
+        return token
+    with _TOKEN_LOCK:
+        # Another request may have logged in while this one waited.
+        token = _cached_token()
+        if token:
+            return token
+        now = time.time()
+        try:
+            resp = _CLIENT.post(_LOGIN_PATH, json={"User": user, "Password": password})
+            resp.raise_for_status()
+        except httpx.HTTPError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail=f"GeoVictoria auth failed: {exc}",
+            ) from exc
+        payload = resp.json()
+        token = payload.get("token")
+        if not token:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="GeoVictoria auth did not return a token",
+            )
+        _TOKEN_CACHE["token"] = token
+        # Renew a little early so a token never expires mid-request.
+        _TOKEN_CACHE["expires_at"] = (
+            now + settings.geovictoria_token_ttl_seconds - _TOKEN_REFRESH_SKEW_SECONDS
         )
-    _TOKEN_CACHE["token"] = token
-    _TOKEN_CACHE["expires_at"] = now + settings.geovictoria_token_ttl_seconds
-    return token
+        return token
+
+
+def _invalidate_token(token: str) -> None:
+    with _TOKEN_LOCK:
+        # Leave a newer token alone if another request already replaced this one.
+        if _TOKEN_CACHE.get("token") == token:
+            _TOKEN_CACHE["token"] = None
+            _TOKEN_CACHE["expires_at"] = 0.0
 
 
 def _post_geovictoria(endpoint: str, payload: Mapping[str, Any]) -> Any:
     token = _get_token()
-    url = f"{settings.geovictoria_base_url}/{endpoint.lstrip('/')}"
+    url = f"/{endpoint.lstrip('/')}"
     try:
-        resp = httpx.post(
+        resp = _CLIENT.post(
             url,
             headers={"Authorization": f"Bearer {token}"},
             json=payload,
             timeout=60,
         )
         if resp.status_code in (401, 403):
-            _TOKEN_CACHE["token"] = None
-            _TOKEN_CACHE["expires_at"] = 0.0
+            _invalidate_token(token)
             token = _get_token()
-            resp = httpx.post(
+            resp = _CLIENT.post(
                 url,
                 headers={"Authorization": f"Bearer {token}"},
                 json=payload,
@@ -193,7 +244,7 @@ def _extract_users(payload: Any) -> list[Mapping[str, Any]]:
     if isinstance(payload, list):
         return payload
     if isinstance(payload, dict):
-        for key in ("Data", "Users", "Lista"):
+        for key in _USER_LIST_KEYS:
             value = payload.get(key)
             if isinstance(value, list):
                 return value
@@ -201,7 +252,7 @@ def _extract_users(payload: Any) -> list[Mapping[str, Any]]:
 
 
 def _extract_id(raw: Mapping[str, Any]) -> str | None:
-    for key in ("Id", "ID", "UserId", "UserID"):
+    for key in _ID_KEYS:
         value = raw.get(key)
         if value is not None:
             return str(value).strip() or None
@@ -218,9 +269,9 @@ def _normalize_user(raw: Mapping[str, Any]) -> GeoVictoriaWorker:
     enabled = raw.get("Enabled")
     if isinstance(enabled, str):
         normalized = enabled.strip().lower()
-        if normalized in {"true", "1", "yes", "y", "si", "s"}:
+        if normalized in _TRUTHY:
             enabled = True
-        elif normalized in {"false", "0", "no", "n"}:
+        elif normalized in _FALSY:
             enabled = False
         else:
             enabled = None
@@ -255,21 +306,19 @@ def _summarize_user(user: GeoVictoriaWorker) -> GeoVictoriaWorkerSummary | None:
     )
 
 
-def _fetch_users() -> list[GeoVictoriaWorker]:
+def _load_users() -> list[GeoVictoriaWorker]:
     def _post_user_list(token: str) -> httpx.Response:
-        return httpx.post(
-            f"{settings.geovictoria_base_url}/User/List",
+        return _CLIENT.post(
+            _USER_LIST_PATH,
             headers={"Authorization": f"Bearer {token}"},
             json={},
-            timeout=30,
         )
 
     token = _get_token()
     try:
         resp = _post_user_list(token)
         if resp.status_code in (401, 403):
-            _TOKEN_CACHE["token"] = None
-            _TOKEN_CACHE["expires_at"] = 0.0
+            _invalidate_token(token)
             token = _get_token()
             resp = _post_user_list(token)
         resp.raise_for_status()
@@ -282,25 +331,80 @@ def _fetch_users() -> list[GeoVictoriaWorker]:
     return [_normalize_user(user) for user in raw_users]
 
 
+def _is_upstream_unavailable(exc: HTTPException) -> bool:
+    cause = exc.__cause__
+    if isinstance(cause, httpx.HTTPStatusError):
+        return cause.response.status_code >= 500
+    return isinstance(cause, httpx.TransportError)
+
+
+@dataclass(frozen=True)
+class _UsersIndex:
+    users: list[GeoVictoriaWorker]
+    by_id: dict[str, GeoVictoriaWorker]
+    searchable: list[tuple[str, GeoVictoriaWorker]]
+
+
+def _build_users_index(users: list[GeoVictoriaWorker]) -> _UsersIndex:
+    return _UsersIndex(
+        users=users,
+        # Reversed so the first user with a given id wins, as in a linear scan.
+        by_id={
+            user.geovictoria_id: user
+            for user in reversed(users)
+            if user.geovictoria_id
+        },
+        # One joined string per user rather than per-field tests, so a query
+        # spanning fields ("ana perez") still matches.
+        searchable=[
+            (
+                " ".join(
+                    filter(
+                        None,
+                        [user.first_name, user.last_name, user.identifier, user.email],
+                    )
+                ).casefold(),
+                user,
+            )
+            for user in users
+        ],
+    )
+
+
+def _get_users_index() -> _UsersIndex:
+    index = _USERS_CACHE["index"]
+    if index is not None and time.monotonic() < _USERS_CACHE["expires_at"]:
+        return index
+    with _USERS_LOCK:
+        index = _USERS_CACHE["index"]
+        if index is not None and time.monotonic() < _USERS_CACHE["expires_at"]:
+            return index
+        try:
+            fresh = _build_users_index(_load_users())
+        except HTTPException as exc:
+            if index is None or not _is_upstream_unavailable(exc):
+                raise
+            logger.warning("GeoVictoria user list unavailable, serving stale copy: %s", exc.detail)
+            return index
+        _USERS_CACHE["index"] = fresh
+        _USERS_CACHE["expires_at"] = (
+            time.monotonic() + settings.geovictoria_users_cache_ttl_seconds
+        )
+        return fresh
+
+
+def _fetch_users() -> list[GeoVictoriaWorker]:
+    return _get_users_index().users
+
+
 @router.get("/workers", response_model=list[GeoVictoriaWorker])
 def search_workers(
     query: str = Query(..., min_length=2),
     limit: int = Query(8, ge=1, le=25),
 ) -> list[GeoVictoriaWorker]:
-    q = query.strip().lower()
+    q = query.strip().casefold()
     results: list[GeoVictoriaWorker] = []
-    for user in _fetch_users():
-        haystack = " ".join(
-            filter(
-                None,
-                [
-                    user.first_name,
-                    user.last_name,
-                    user.identifier,
-                    user.email,
-                ],
-            )
-        ).lower()
+    for haystack, user in _get_users_index().searchable:
         if q in haystack:
             results.append(user)
         if len(results) >= limit:
@@ -322,10 +426,9 @@ def list_active_workers() -> list[GeoVictoriaWorkerSummary]:
 
 @router.get("/workers/{geovictoria_id}", response_model=GeoVictoriaWorker)
 def get_worker(geovictoria_id: str) -> GeoVictoriaWorker:
-    target = geovictoria_id.strip()
-    for user in _fetch_users():
-        if user.geovictoria_id == target:
-            return user
+    user = _get_users_index().by_id.get(geovictoria_id.strip())
+    if user is not None:
+        return user
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="GeoVictoria worker not found")
 
 
@@ -372,18 +475,22 @@ def get_attendance(
     consolidated_payload = {**payload, "IncludeAll": 0}
 
     warnings: list[str] = []
-    attendance, attendance_identifier = _post_with_candidates(
+    attendance_future = _GEO_EXECUTOR.submit(
+        _post_with_candidates,
         "AttendanceBook",
         payload,
         candidates,
     )
+    consolidated_future = _GEO_EXECUTOR.submit(
+        _post_with_candidates,
+        "Consolidated",
+        consolidated_payload,
+        candidates,
+    )
+    attendance, attendance_identifier = attendance_future.result()
     consolidated = None
     try:
-        consolidated, consolidated_identifier = _post_with_candidates(
-            "Consolidated",
-            consolidated_payload,
-            candidates,
-        )
+        consolidated, consolidated_identifier = consolidated_future.result()
         if consolidated_identifier != attendance_identifier:
             logger.warning(
                 "GeoVictoria consolidated fallback used worker_id=%s identifier=%s fallback=%s",
@@ -1,8 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+from typing import Any
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import exists, select, true
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_admin, get_db
+from app.api.deps import get_current_admin, get_db, get_db_keep_loaded
+from app.db.session import with_strict_loading
 from app.models.admin import AdminUser
 from app.models.house import HouseParameter, HouseParameterValue, HouseType
 from app.schemas.parameters import (
@@ -17,21 +20,56 @@ from app.schemas.parameters import (
 router = APIRouter()
 
 
+def _validate_value_references(db: Session, values: dict[str, Any]) -> None:
+    """Check the parameter and house type referenced by `values` in one
+    round-trip; keys missing from `values` are not being set and pass."""
+    if "parameter_id" not in values and "house_type_id" not in values:
+        return
+    parameter_found, house_type_found = db.execute(
+        select(
+            exists().where(HouseParameter.id == values["parameter_id"])
+            if "parameter_id" in values
+            else true(),
+            exists().where(HouseType.id == values["house_type_id"])
+            if "house_type_id" in values
+            else true(),
+        )
+    ).one()
+    if not parameter_found:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="House parameter not found"
+        )
+    if not house_type_found:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="House type not found"
+        )
+
+
 @router.get("", response_model=list[HouseParameterRead])
-def list_house_parameters(db: Session = Depends(get_db)) -> list[HouseParameter]:
-    return list(db.execute(select(HouseParameter).order_by(HouseParameter.name)).scalars())
+def list_house_parameters(
+    limit: int | None = Query(default=None, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    db: Session = Depends(get_db),
+) -> list[HouseParameter]:
+    stmt = with_strict_loading(
+        select(HouseParameter).order_by(HouseParameter.name, HouseParameter.id)
+    )
+    if offset:
+        stmt = stmt.offset(offset)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return db.scalars(stmt).all()
 
 
 @router.post("", response_model=HouseParameterRead, status_code=status.HTTP_201_CREATED)
 def create_house_parameter(
     payload: HouseParameterCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_keep_loaded),
     _admin: AdminUser = Depends(get_current_admin),
 ) -> HouseParameter:
     parameter = HouseParameter(**payload.model_dump())
     db.add(parameter)
     db.commit()
-    db.refresh(parameter)
     return parameter
 
 
@@ -49,7 +87,7 @@ def get_house_parameter(parameter_id: int, db: Session = Depends(get_db)) -> Hou
 def update_house_parameter(
     parameter_id: int,
     payload: HouseParameterUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_keep_loaded),
     _admin: AdminUser = Depends(get_current_admin),
 ) -> HouseParameter:
     parameter = db.get(HouseParameter, parameter_id)
@@ -60,7 +98,6 @@ def update_house_parameter(
     for key, value in payload.model_dump(exclude_unset=True).items():
         setattr(parameter, key, value)
     db.commit()
-    db.refresh(parameter)
     return parameter
 
 
@@ -81,10 +118,21 @@ def delete_house_parameter(
 
 @router.get("/{parameter_id}/values", response_model=list[HouseParameterValueRead])
 def list_house_parameter_values(
-    parameter_id: int, db: Session = Depends(get_db)
+    parameter_id: int,
+    limit: int | None = Query(default=None, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    db: Session = Depends(get_db),
 ) -> list[HouseParameterValue]:
-    stmt = select(HouseParameterValue).where(HouseParameterValue.parameter_id == parameter_id)
-    return list(db.execute(stmt.order_by(HouseParameterValue.id)).scalars())
+    stmt = with_strict_loading(
+        select(HouseParameterValue)
+        .where(HouseParameterValue.parameter_id == parameter_id)
+        .order_by(HouseParameterValue.id)
+    )
+    if offset:
+        stmt = stmt.offset(offset)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return db.scalars(stmt).all()
 
 
 @router.post(
@@ -95,7 +143,7 @@ def list_house_parameter_values(
 def create_house_parameter_value(
     parameter_id: int,
     payload: HouseParameterValueCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_keep_loaded),
     _admin: AdminUser = Depends(get_current_admin),
 ) -> HouseParameterValue:
     if parameter_id != payload.parameter_id:
@@ -103,18 +151,10 @@ def create_house_parameter_value(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Parameter id mismatch",
         )
-    if not db.get(HouseParameter, payload.parameter_id):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="House parameter not found"
-        )
-    if not db.get(HouseType, payload.house_type_id):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="House type not found"
-        )
+    _validate_value_references(db, payload.model_dump())
     value = HouseParameterValue(**payload.model_dump())
     db.add(value)
     db.commit()
-    db.refresh(value)
     return value
 
 
@@ -134,7 +174,7 @@ def get_house_parameter_value(
 def update_house_parameter_value(
     value_id: int,
     payload: HouseParameterValueUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_keep_loaded),
     _admin: AdminUser = Depends(get_current_admin),
 ) -> HouseParameterValue:
     value = db.get(HouseParameterValue, value_id)
@@ -143,18 +183,10 @@ def update_house_parameter_value(
             status_code=status.HTTP_404_NOT_FOUND, detail="House parameter value not found"
         )
     updates = payload.model_dump(exclude_unset=True)
-    if "parameter_id" in updates and not db.get(HouseParameter, updates["parameter_id"]):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="House parameter not found"
-        )
-    if "house_type_id" in updates and not db.get(HouseType, updates["house_type_id"]):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="House type not found"
-        )
+    _validate_value_references(db, updates)
     for key, val in updates.items():
         setattr(value, key, val)
     db.commit()
-    db.refresh(value)
     return value
 
 
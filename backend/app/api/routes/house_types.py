@@ -1,10 +1,11 @@
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import delete, func, or_, select
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy import delete, func, literal, or_, select
 from sqlalchemy.orm import Session
 
-from app.api.deps import get_current_admin, get_db
+from app.api.deps import get_current_admin, get_db, get_db_keep_loaded
+from app.db.session import with_strict_loading
 from app.models.admin import AdminUser
 from app.models.house import HouseParameterValue, HouseSubType, HouseType, PanelDefinition
 from app.models.qc import (
@@ -43,6 +44,10 @@ def _count(db: Session, stmt) -> int:
     return int(db.scalar(stmt) or 0)
 
 
+def _exists(db: Session, model, pk: int) -> bool:
+    return db.scalar(select(literal(1)).where(model.id == pk).limit(1)) is not None
+
+
 def _house_type_cascade_queries(house_type_id: int):
     sub_type_ids = select(HouseSubType.id).where(
         HouseSubType.house_type_id == house_type_id
@@ -368,20 +373,28 @@ def _delete_house_type_cascade(db: Session, house_type_id: int, queries) -> None
 
 
 @router.get("", response_model=list[HouseTypeRead])
-def list_house_types(db: Session = Depends(get_db)) -> list[HouseType]:
-    return list(db.execute(select(HouseType).order_by(HouseType.name)).scalars())
+def list_house_types(
+    limit: int | None = Query(default=None, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    db: Session = Depends(get_db),
+) -> list[HouseType]:
+    stmt = with_strict_loading(select(HouseType).order_by(HouseType.name, HouseType.id))
+    if offset:
+        stmt = stmt.offset(offset)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return db.scalars(stmt).all()
 
 
 @router.post("", response_model=HouseTypeRead, status_code=status.HTTP_201_CREATED)
 def create_house_type(
     payload: HouseTypeCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_keep_loaded),
     _admin: AdminUser = Depends(get_current_admin),
 ) -> HouseType:
     house_type = HouseType(**payload.model_dump())
     db.add(house_type)
     db.commit()
-    db.refresh(house_type)
     return house_type
 
 
@@ -397,7 +410,7 @@ def get_house_type(house_type_id: int, db: Session = Depends(get_db)) -> HouseTy
 def update_house_type(
     house_type_id: int,
     payload: HouseTypeUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_keep_loaded),
     _admin: AdminUser = Depends(get_current_admin),
 ) -> HouseType:
     house_type = db.get(HouseType, house_type_id)
@@ -406,7 +419,6 @@ def update_house_type(
     for key, value in payload.model_dump(exclude_unset=True).items():
         setattr(house_type, key, value)
     db.commit()
-    db.refresh(house_type)
     return house_type
 
 
@@ -449,10 +461,21 @@ def delete_house_type(
 
 @router.get("/{house_type_id}/subtypes", response_model=list[HouseSubTypeRead])
 def list_house_subtypes(
-    house_type_id: int, db: Session = Depends(get_db)
+    house_type_id: int,
+    limit: int | None = Query(default=None, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
+    db: Session = Depends(get_db),
 ) -> list[HouseSubType]:
-    stmt = select(HouseSubType).where(HouseSubType.house_type_id == house_type_id)
-    return list(db.execute(stmt.order_by(HouseSubType.name)).scalars())
+    stmt = with_strict_loading(
+        select(HouseSubType)
+        .where(HouseSubType.house_type_id == house_type_id)
+        .order_by(HouseSubType.name, HouseSubType.id)
+    )
+    if offset:
+        stmt = stmt.offset(offset)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return db.scalars(stmt).all()
 
 
 @router.post(
@@ -463,16 +486,14 @@ def list_house_subtypes(
 def create_house_subtype(
     house_type_id: int,
     payload: HouseSubTypeCreate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_keep_loaded),
     _admin: AdminUser = Depends(get_current_admin),
 ) -> HouseSubType:
-    house_type = db.get(HouseType, house_type_id)
-    if not house_type:
+    if not _exists(db, HouseType, house_type_id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="House type not found")
     subtype = HouseSubType(house_type_id=house_type_id, name=payload.name)
     db.add(subtype)
     db.commit()
-    db.refresh(subtype)
     return subtype
 
 
@@ -488,21 +509,20 @@ def get_house_subtype(sub_type_id: int, db: Session = Depends(get_db)) -> HouseS
 def update_house_subtype(
     sub_type_id: int,
     payload: HouseSubTypeUpdate,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db_keep_loaded),
     _admin: AdminUser = Depends(get_current_admin),
 ) -> HouseSubType:
     subtype = db.get(HouseSubType, sub_type_id)
     if not subtype:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="House subtype not found")
     updates = payload.model_dump(exclude_unset=True)
-    if "house_type_id" in updates and not db.get(HouseType, updates["house_type_id"]):
+    if "house_type_id" in updates and not _exists(db, HouseType, updates["house_type_id"]):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="House type not found"
         )
     for key, value in updates.items():
         setattr(subtype, key, value)
     db.commit()
-    db.refresh(subtype)
     return subtype
 
 
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 
 from app.api.deps import get_current_admin, get_db
@@ -15,12 +15,13 @@ def _validate_station_ids(
     db: Session,
     station_ids: list[int] | None,
 ) -> None:
-    if station_ids is None:
-        return
     if not station_ids:
         return
-    stations = list(db.execute(select(Station.id).where(Station.id.in_(station_ids))).scalars())
-    if len(stations) != len(set(station_ids)):
+    unique_ids = set(station_ids)
+    count = db.execute(
+        select(func.count()).select_from(Station).where(Station.id.in_(unique_ids))
+    ).scalar_one()
+    if count != len(unique_ids):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="One or more stations not found",
@@ -1,8 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlalchemy.orm import Session
 
-from app.api.deps import WORKER_SESSION_COOKIE, get_current_worker_session, get_db
-from app.core.security import hash_token, new_session_token, session_expiry, utc_now
+from app.api.deps import (
+    WORKER_SESSION_COOKIE,
+    forget_worker_session,
+    get_current_worker_session,
+    get_db,
+    get_now,
+)
+from app.core.security import (
+    SESSION_TTL_SECONDS,
+    hash_token,
+    new_session_token,
+    session_expiry,
+)
 from app.models.workers import Worker, WorkerSession
 from app.schemas.worker_sessions import (
     WorkerSessionLoginRequest,
@@ -21,6 +34,7 @@ def worker_login(
     payload: WorkerSessionLoginRequest,
     response: Response,
     db: Session = Depends(get_db),
+    now: datetime = Depends(get_now),
 ) -> WorkerSessionRead:
     worker = db.get(Worker, payload.worker_id)
     if not worker:
@@ -31,11 +45,11 @@ def worker_login(
         if not payload.pin or worker.pin != payload.pin:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid PIN")
     token = new_session_token()
-    expires_at = session_expiry()
+    expires_at = session_expiry(now=now)
     session = WorkerSession(
         worker_id=worker.id,
         token_hash=hash_token(token),
-        created_at=utc_now(),
+        created_at=now,
         expires_at=expires_at,
         station_id=payload.station_id,
     )
@@ -46,7 +60,7 @@ def worker_login(
         value=token,
         httponly=True,
         samesite="lax",
-        max_age=int((expires_at - utc_now()).total_seconds()),
+        max_age=SESSION_TTL_SECONDS,
         path="/",
     )
     return WorkerSessionRead(
@@ -59,15 +73,14 @@ def worker_login(
 
 @router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
 def worker_logout(
-    request: Request,
     response: Response,
     session: WorkerSession = Depends(get_current_worker_session),
     db: Session = Depends(get_db),
+    now: datetime = Depends(get_now),
 ) -> None:
-    token = request.cookies.get(WORKER_SESSION_COOKIE)
-    if token:
-        session.revoked_at = utc_now()
-        db.commit()
+    forget_worker_session(session)
+    session.revoked_at = now
+    db.commit()
     response.delete_cookie(WORKER_SESSION_COOKIE, path="/")
 
 
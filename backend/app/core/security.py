@@ -4,6 +4,8 @@ import hashlib
 import secrets
 from datetime import datetime, timedelta, timezone
 
+SESSION_TTL_SECONDS = 12 * 60 * 60
+
 
 def new_session_token() -> str:
     return secrets.token_urlsafe(32)
@@ -17,5 +19,7 @@ def utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def session_expiry(hours: int = 12) -> datetime:
-    return utc_now() + timedelta(hours=hours)
+def session_expiry(
+    ttl_seconds: int = SESSION_TTL_SECONDS, now: datetime | None = None
+) -> datetime:
+    return (now or utc_now()) + timedelta(seconds=ttl_seconds)
@@ -0,0 +1,136 @@
+"""Batched DDL helpers for migrations.
+
+A revision lists its tables once and derives both directions from that list:
+`apply` creates the tables and their indexes, `unapply` drops them, each as a
+single batched statement. `batched_alter` folds column-level changes to one
+table into a single ALTER TABLE.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateIndex, CreateTable, DDLElement
+
+
+@dataclass
+class TableSpec:
+    """DDL-level shape of a table: column types, nullability and server defaults,
+    keys and indexes.
+
+    `foreign_keys` maps a column to its "table.column" target, `on_delete`
+    gives the ON DELETE action for some of those columns, and `indexes` and
+    `unique` map a constraint name to its columns. Specs must be listed so
+    referenced tables come first.
+    """
+
+    name: str
+    columns: tuple[sa.Column, ...]
+    indexes: dict[str, tuple[str, ...]] = field(default_factory=dict)
+    foreign_keys: dict[str, str] = field(default_factory=dict)
+    on_delete: dict[str, str] = field(default_factory=dict)
+    unique: dict[str, tuple[str, ...]] = field(default_factory=dict)
+    primary_key: tuple[str, ...] = ("id",)
+
+
+def _build(specs: Iterable[TableSpec]) -> list[sa.Table]:
+    specs = list(specs)
+    metadata = sa.MetaData()
+    names = {spec.name for spec in specs}
+    # Tables outside the spec list only need their key columns for FK compilation.
+    referenced: dict[str, set[str]] = {}
+    for spec in specs:
+        for target in spec.foreign_keys.values():
+            table, column = target.split(".")
+            if table not in names:
+                referenced.setdefault(table, set()).add(column)
+    for table, columns in referenced.items():
+        sa.Table(
+            table, metadata, *(sa.Column(column, sa.Integer()) for column in columns)
+        )
+
+    return [
+        sa.Table(
+            spec.name,
+            metadata,
+            *(
+                sa.Column(
+                    column.name,
+                    column.type,
+                    nullable=column.nullable,
+                    server_default=(
+                        column.server_default.arg
+                        if column.server_default is not None
+                        else None
+                    ),
+                )
+                for column in spec.columns
+            ),
+            sa.PrimaryKeyConstraint(*spec.primary_key),
+            *(
+                sa.ForeignKeyConstraint(
+                    [column], [target], ondelete=spec.on_delete.get(column)
+                )
+                for column, target in spec.foreign_keys.items()
+            ),
+            *(
+                sa.UniqueConstraint(*columns, name=name)
+                for name, columns in spec.unique.items()
+            ),
+            *(sa.Index(name, *columns) for name, columns in spec.indexes.items()),
+        )
+        for spec in specs
+    ]
+
+
+def _execute_batch(elements: Iterable[DDLElement]) -> None:
+    dialect = op.get_context().dialect
+    statements = [str(element.compile(dialect=dialect)) for element in elements]
+    if statements:
+        op.execute(";\n".join(statements))
+
+
+def _create_table_ddl(tables: list[sa.Table]) -> list[DDLElement]:
+    return [CreateTable(table, if_not_exists=True) for table in tables]
+
+
+def _create_index_ddl(tables: list[sa.Table]) -> list[DDLElement]:
+    return [
+        CreateIndex(index, if_not_exists=True)
+        for table in tables
+        for index in sorted(table.indexes, key=lambda index: index.name)
+    ]
+
+
+def create_tables(specs: Iterable[TableSpec]) -> None:
+    _execute_batch(_create_table_ddl(_build(specs)))
+
+
+def create_indexes(specs: Iterable[TableSpec]) -> None:
+    _execute_batch(_create_index_ddl(_build(specs)))
+
+
+def apply(specs: Iterable[TableSpec]) -> None:
+    """Create the tables and then their indexes in one round-trip."""
+    tables = _build(specs)
+    _execute_batch(_create_table_ddl(tables) + _create_index_ddl(tables))
+
+
+def batched_alter(table: str, *clauses: str) -> None:
+    """Apply several ALTER TABLE actions in one statement and one lock acquisition."""
+    if clauses:
+        op.execute(f"ALTER TABLE {table} {', '.join(clauses)}")
+
+
+def unapply(specs: Iterable[TableSpec]) -> None:
+    """Drop the tables and their indexes in one statement.
+
+    Foreign keys between the listed tables are resolved by the multi-table
+    DROP; anything else still depending on them makes the statement fail.
+    """
+    names = ", ".join(spec.name for spec in specs)
+    if names:
+        op.execute(f"DROP TABLE IF EXISTS {names}")
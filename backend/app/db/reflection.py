@@ -0,0 +1,167 @@
+"""Schema reflection shared by Alembic revisions within a single run.
+
+`alembic upgrade head` executes every pending revision on the same connection,
+so the catalog only needs to be reflected once. Revisions that change the
+schema go through the `SchemaSnapshot` DDL helpers, which keep the snapshot in
+step with what was just executed instead of re-reading `pg_catalog`.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any
+
+from alembic import op
+import sqlalchemy as sa
+
+# With ALEMBIC_STRICT=1 the database is trusted to match alembic_version, so
+# revisions that support it skip their reflection guards and rely on
+# IF [NOT] EXISTS DDL to stay idempotent.
+SKIP_SCHEMA_GUARDS = os.environ.get("ALEMBIC_STRICT") == "1"
+
+_cache: dict[int, tuple[Any, sa.Inspector, "SchemaSnapshot"]] = {}
+
+
+class SchemaSnapshot:
+    """Table, column, index and foreign key names for the default schema."""
+
+    def __init__(self, inspector: sa.Inspector) -> None:
+        self.inspector = inspector
+        self._columns: dict[str, frozenset[str]] | None = None
+        self._indexes: dict[str, frozenset[str]] = {}
+        self._foreign_keys: dict[str, list[dict[str, Any]]] = {}
+        self._stale: set[str] = set()
+
+    def _load(self) -> dict[str, frozenset[str]]:
+        if self._columns is None:
+            self._columns = {
+                table: frozenset(col["name"] for col in cols)
+                for (_, table), cols in self.inspector.get_multi_columns().items()
+            }
+            self._indexes = {
+                table: frozenset(idx["name"] for idx in idxs)
+                for (_, table), idxs in self.inspector.get_multi_indexes().items()
+            }
+        if self._stale:
+            # Re-reflect every table touched since the last read in one pass.
+            stale = list(self._stale)
+            self.inspector.clear_cache()
+            for table in stale:
+                self._columns.pop(table, None)
+                self._indexes.pop(table, None)
+            self._columns.update(
+                (table, frozenset(col["name"] for col in cols))
+                for (_, table), cols in self.inspector.get_multi_columns(
+                    filter_names=stale
+                ).items()
+            )
+            self._indexes.update(
+                (table, frozenset(idx["name"] for idx in idxs))
+                for (_, table), idxs in self.inspector.get_multi_indexes(
+                    filter_names=stale
+                ).items()
+            )
+            self._stale.clear()
+        return self._columns
+
+    def prewarm(self) -> None:
+        """Reflect columns, indexes and foreign keys for every table up front."""
+        self._load()
+        for (_, table), fks in self.inspector.get_multi_foreign_keys().items():
+            self._foreign_keys.setdefault(table, fks)
+
+    @property
+    def table_names(self) -> frozenset[str]:
+        return frozenset(self._load())
+
+    def has_table(self, table: str) -> bool:
+        return table in self._load()
+
+    def columns(self, table: str) -> frozenset[str]:
+        return self._load().get(table, frozenset())
+
+    def indexes(self, table: str) -> frozenset[str]:
+        self._load()
+        return self._indexes.get(table, frozenset())
+
+    def foreign_keys(self, table: str) -> list[dict[str, Any]]:
+        if table not in self._foreign_keys:
+            self._foreign_keys[table] = (
+                self.inspector.get_foreign_keys(table) if self.has_table(table) else []
+            )
+        return self._foreign_keys[table]
+
+    def invalidate(self, table: str) -> None:
+        """Re-reflect `table` on next access, e.g. after raw `op.execute` DDL."""
+        self._stale.add(table)
+        self._foreign_keys.pop(table, None)
+
+    def create_table(self, table: str, *elements: Any, **kw: Any) -> sa.Table:
+        result = op.create_table(table, *elements, **kw)
+        self._load()[table] = frozenset(
+            element.name for element in elements if isinstance(element, sa.Column)
+        )
+        self._indexes[table] = frozenset()
+        self._foreign_keys.pop(table, None)
+        return result
+
+    def drop_table(self, table: str) -> None:
+        op.drop_table(table)
+        self._load().pop(table, None)
+        self._indexes.pop(table, None)
+        self._foreign_keys.pop(table, None)
+
+    def add_column(self, table: str, column: sa.Column) -> None:
+        op.add_column(table, column)
+        columns = self._load()
+        columns[table] = columns.get(table, frozenset()) | {column.name}
+        self._foreign_keys.pop(table, None)
+
+    def drop_column(self, table: str, column: str) -> None:
+        op.drop_column(table, column)
+        # Postgres drops dependent indexes and constraints along with the column.
+        self.invalidate(table)
+
+    def create_foreign_key(self, name: str, table: str, *args: Any, **kw: Any) -> None:
+        op.create_foreign_key(name, table, *args, **kw)
+        self._foreign_keys.pop(table, None)
+
+    def drop_constraint(self, name: str, table: str, **kw: Any) -> None:
+        op.drop_constraint(name, table, **kw)
+        self._foreign_keys.pop(table, None)
+
+    def create_index(self, name: str, table: str, *args: Any, **kw: Any) -> None:
+        op.create_index(name, table, *args, **kw)
+        self._load()
+        self._indexes[table] = self._indexes.get(table, frozenset()) | {name}
+
+    def create_index_concurrently(
+        self, name: str, table: str, columns: list[str]
+    ) -> None:
+        """Build an index on an already populated table without blocking writes.
+
+        CONCURRENTLY can't run inside a transaction block, so the migration
+        transaction is committed first and the index is built in autocommit mode.
+        """
+        with op.get_context().autocommit_block():
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} "
+                f"ON {table} ({', '.join(columns)})"
+            )
+        self._load()
+        self._indexes[table] = self._indexes.get(table, frozenset()) | {name}
+
+    def drop_index(self, name: str, table_name: str) -> None:
+        op.drop_index(name, table_name=table_name)
+        self._load()
+        self._indexes[table_name] = self._indexes.get(table_name, frozenset()) - {name}
+
+
+def get_cached_inspector(bind) -> tuple[sa.Inspector, SchemaSnapshot]:
+    """Return the inspector and snapshot for `bind`, reflecting on first use."""
+    cached = _cache.get(id(bind))
+    if cached is None or cached[0] is not bind:
+        inspector = sa.inspect(bind)
+        cached = (bind, inspector, SchemaSnapshot(inspector))
+        _cache[id(bind)] = cached
+    return cached[1], cached[2]
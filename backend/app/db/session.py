@@ -1,7 +1,20 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from typing import TypeVar
+
+from sqlalchemy import Select, create_engine
+from sqlalchemy.orm import raiseload, sessionmaker
 
 from app.core.config import settings
 
 engine = create_engine(settings.database_url, echo=settings.echo_sql, pool_pre_ping=True)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+SelectT = TypeVar("SelectT", bound=Select)
+
+
+def with_strict_loading(stmt: SelectT) -> SelectT:
+    """Forbid lazy relationship loads on the rows of `stmt` when STRICT_LOADING
+    is set, so a response schema that starts reading a relationship fails
+    loudly instead of issuing one query per row."""
+    if settings.strict_loading:
+        return stmt.options(raiseload("*"))
+    return stmt
@@ -6,6 +6,7 @@ import random
 import time
 import uuid
 
+import anyio.to_thread
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, RedirectResponse
@@ -117,6 +118,16 @@ async def _run_shift_estimate_scheduler() -> None:
         await asyncio.sleep(poll_seconds)
 
 
+@app.on_event("startup")
+async def configure_threadpool() -> None:
+    # Sync routes, and the sync DB dependencies of async routes, all share this
+    # limiter; auth traffic is mostly waiting on Postgres, so size it with the
+    # database connection pool rather than with CPU cores.
+    anyio.to_thread.current_default_thread_limiter().total_tokens = (
+        settings.threadpool_size
+    )
+
+
 @app.on_event("startup")
 async def start_backup_scheduler() -> None:
     if not settings.backup_scheduler_enabled: